@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from headless import POLICIES
+from market import Market, Portfolio
+
+## たくさんの市場をseedを変えて同時に動かすモンテカルロ実行
+## 例: python batch.py --runs 10000 --ticks 1000 --policy random
+
+
+## 1回分のシミュレーション
+## 戻り値は(最後の残金, 最後の資産額, 最大ドローダウン, 倒産回数)
+def simulate(seed, ticks, policy="none"):
+    market = Market(seed)
+    portfolio = Portfolio(market)
+    kane0 = portfolio.kane
+    if isinstance(policy, str):
+        policy = POLICIES[policy]
+    policy = policy(seed)
+
+    value = peak = kane0
+    drawdown = 0.0
+    for _ in range(ticks):
+        market.x()
+        portfolio.haitou()
+        if policy is not None:
+            policy(market, portfolio)
+        # 0以下の株価は次のtickで戻されるので0円として数える
+        value = portfolio.kane + int(np.dot(portfolio.motika, np.maximum(market.kabuka, 0)))
+        if value > peak:
+            peak = value
+        elif peak > 0 and (peak - value) / peak > drawdown:
+            drawdown = (peak - value) / peak
+    return (portfolio.kane, value, drawdown, int(market.engine.resets.sum()))
+
+
+## プロセスに渡す単位。seedのまとまりを一度に計算して送り返す
+def _chunk(seeds, ticks, policy):
+    return [simulate(seed, ticks, policy) for seed in seeds]
+
+
+def _summary(a):
+    p5, p50, p95 = np.percentile(a, (5, 50, 95))
+    return {"mean": float(a.mean()), "std": float(a.std()),
+            "min": float(a.min()), "p5": float(p5), "p50": float(p50),
+            "p95": float(p95), "max": float(a.max())}
+
+
+## runs回のシミュレーションをプロセスプールで実行して集計する
+## policyはPOLICIESの名前か、seedを受け取ってpolicyを返すトップレベル関数
+def run_batch(runs, ticks=1000, policy="none", seed=0, workers=None):
+    if runs < 1:
+        raise ValueError("runsは1以上です")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    seeds = range(seed, seed + runs)
+    # 1プロセスあたり4つ程度に分けて、終わるのが遅いプロセスを待たないようにする
+    n = max(1, min(runs, workers * 4))
+    chunks = [seeds[k::n] for k in range(n)]
+
+    rows = []
+    if workers == 1:
+        for c in chunks:
+            rows.extend(_chunk(c, ticks, policy))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_chunk, c, ticks, policy) for c in chunks]
+            for f in futures:
+                rows.extend(f.result())
+
+    a = np.array(rows, dtype=np.float64).reshape(-1, 4)
+    kane0 = Portfolio(Market()).kane
+    return {
+        "runs": runs,
+        "ticks": ticks,
+        "kane": _summary(a[:, 0]),
+        "value": _summary(a[:, 1]),
+        "drawdown": _summary(a[:, 2]),
+        "resets": {"total": int(a[:, 3].sum()), "mean": float(a[:, 3].mean())},
+        "sonshitsu": int((a[:, 1] < kane0).sum()),  # 最初の残金より減った回数
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="株取引ゲームのモンテカルロ実行")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="none")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    result = run_batch(args.runs, args.ticks, args.policy, args.seed, args.workers)
+    result["seconds"] = time.perf_counter() - start
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from array import array
+
+from market import KAU, URU, Market, Order, OrderQueue, Portfolio, PriceEngine
+
+## ベンチマーク
+## どれも乱数のseedを固定しているので、同じマシンなら何度測っても同じ処理をする。
+## 1つのケースはrounds回に分けて測り、1回ごとの「1操作あたりの時間」の分布から
+## p50/p90/p99と1秒あたりの回数(p50から)を出す。
+## compareは、ほかの処理の影響を受けにくい一番速かった回(min)どうしで比べる。
+## 例: python bench.py run --out base.json
+##     (変更したあとで)
+##     python bench.py run --out new.json
+##     python bench.py compare base.json new.json
+## 画面のケースはDISPLAYがあればそこで、なければXvfbがあれば起動して測り、どちらもなければ飛ばす。
+
+## compareで遅くなったとみなす割合
+THRESHOLD = 0.10
+
+
+def percentile(sorted_values, p):
+    k = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+## funcはnumber回の操作をして、その回数を返す。それをrounds回くりかえして測る
+def measure(func, number, rounds):
+    func(max(1, number // 10))  # 温める
+    per_op = []
+    # timeitと同じく、測っている間はGCを止める
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            ops = func(number)
+            per_op.append((time.perf_counter() - start) / ops)
+    finally:
+        if enabled:
+            gc.enable()
+    per_op.sort()
+    return {
+        "ops_per_sec": 1 / percentile(per_op, 50),
+        "p50_us": percentile(per_op, 50) * 1e6,
+        "p90_us": percentile(per_op, 90) * 1e6,
+        "p99_us": percentile(per_op, 99) * 1e6,
+        "min_us": per_op[0] * 1e6,
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+#== 市場
+## n銘柄の市場で1tick(株価の変動と配当)を進める
+def ticks(n):
+    def case(number):
+        if n == 3:
+            market = Market(seed=0)
+        else:
+            k = list(range(n))
+            engine = PriceEngine([1000 + 10 * (i % 900) for i in k], [(1, 2, 5)[i % 3] for i in k],
+                                 [100] * n)
+            market = Market(seed=0, engine=engine)
+        p = Portfolio(market)
+        p.motika = array("q", [1] * n)
+        for _ in range(number):
+            market.x()
+            p.haitou()
+        return number
+    return case
+
+## ko()/ur()と同じくPortfolio.buy()/sell()を交互に呼ぶ
+def trades(number):
+    market = Market(seed=0)
+    p = Portfolio(market, kane=10 ** 12)
+    for k in range(number // 2):
+        i = k % 3
+        p.buy(i, 1)
+        p.sell(i, 1)
+    return number // 2 * 2
+
+## MarketWorkerと同じく注文をOrderQueueにため、100件ごとにまとめて約定させる
+def orders(number):
+    market = Market(seed=0)
+    p = Portfolio(market, kane=10 ** 12)
+    q = OrderQueue(market)
+    for k in range(number):
+        q.submit(Order(p, k % 3, KAU if k % 2 == 0 else URU, 1))
+        if k % 100 == 99:
+            q.match()
+    q.match()
+    return number
+
+
+#== 画面
+## 画面が使えればTkのrootを返す。使えなければNone
+def display():
+    import tkinter
+    try:
+        return tkinter.Tk()
+    except tkinter.TclError:
+        pass
+    if shutil.which("Xvfb") is None:
+        return None
+    # 空いている番号でXvfbを起動する
+    for num in range(99, 120):
+        if os.path.exists("/tmp/.X11-unix/X%d" % num) or os.path.exists("/tmp/.X%d-lock" % num):
+            continue
+        proc = subprocess.Popen(["Xvfb", ":%d" % num, "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.environ["DISPLAY"] = ":%d" % num
+        for _ in range(50):
+            time.sleep(0.1)
+            try:
+                root = tkinter.Tk()
+                root._xvfb = proc
+                return root
+            except tkinter.TclError:
+                pass
+        proc.terminate()
+        return None
+    return None
+
+def widget_cases(root):
+    from tentoapp import Button, Chart, Label
+
+    label = Label(root)
+    label.pack()
+    button = Button(root)
+    button.pack()
+    chart = Chart(root, width=400, height=150)
+    chart.add("red")
+    chart.pack()
+    root.update()
+
+    def label_set(number):
+        for k in range(number):
+            label.text = k
+        return number
+
+    def label_set_same(number):
+        for _ in range(number):
+            label.text = "same"
+        return number
+
+    def label_get(number):
+        for _ in range(number):
+            label.text
+        return number
+
+    def disabled_get(number):
+        for _ in range(number):
+            button.disabled
+        return number
+
+    def fontsize_set(number):
+        for k in range(number):
+            button.fontsize = 10 + k % 4
+        return number
+
+    def chart_push(number):
+        for k in range(number):
+            chart.push(k % 100)
+        root.update_idletasks()
+        return number
+
+    return [
+        ("widget.label_set", label_set, 20000),
+        ("widget.label_set_same", label_set_same, 100000),
+        ("widget.label_get", label_get, 100000),
+        ("widget.disabled_get", disabled_get, 100000),
+        ("widget.fontsize_set", fontsize_set, 2000),
+        ("widget.chart_push", chart_push, 5000),
+    ]
+
+
+def run(rounds=15, quick=False, only=None):
+    scale = 10 if quick else 1
+    cases = [
+        ("ticks.n3", ticks(3), 20000),
+        ("ticks.n100", ticks(100), 10000),
+        ("ticks.n10000", ticks(10000), 1000),
+        ("trades", trades, 20000),
+        ("orders", orders, 20000),
+    ]
+    root = None
+    if only is None or "widget" in only:
+        root = display()
+        if root is None:
+            print("画面が使えないのでwidgetのケースは飛ばします", file=sys.stderr)
+        else:
+            cases += widget_cases(root)
+
+    results = {}
+    try:
+        for name, func, number in cases:
+            if only is not None and only not in name:
+                continue
+            r = measure(func, max(1, number // scale), rounds)
+            results[name] = r
+            print("%-24s %14.0f /s  p50 %9.2f us  p90 %9.2f us  p99 %9.2f us" % (
+                name, r["ops_per_sec"], r["p50_us"], r["p90_us"], r["p99_us"]), file=sys.stderr)
+    finally:
+        if root is not None:
+            xvfb = getattr(root, "_xvfb", None)
+            root.destroy()
+            if xvfb is not None:
+                xvfb.terminate()
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+## baseとnewのケースごとに(名前, base, new, 変化の割合, thresholdより遅くなったか)を返す
+def compare(base, new, threshold=THRESHOLD):
+    rows = []
+    for name, b in base["results"].items():
+        n = new["results"].get(name)
+        if n is None:
+            continue
+        change = n["min_us"] / b["min_us"] - 1
+        rows.append((name, b["min_us"], n["min_us"], change, change > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="株取引ゲームのベンチマーク")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="測ってJSONを出す")
+    p.add_argument("--out", help="結果を書くファイル(省くと標準出力)")
+    p.add_argument("--rounds", type=int, default=15)
+    p.add_argument("--quick", action="store_true", help="1回の操作数を1/10にする")
+    p.add_argument("--only", help="名前にこれを含むケースだけ測る")
+    p = sub.add_parser("compare", help="2つの結果を比べる。遅くなったものがあれば終了コード1")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=THRESHOLD, help="遅くなったとみなす割合")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        result = run(args.rounds, args.quick, args.only)
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold)
+    print("%-24s %12s %12s %8s" % ("case", "base min us", "new min us", "change"))
+    for name, b, n, change, slower in rows:
+        print("%-24s %12.2f %12.2f %+7.1f%% %s" % (name, b, n, change * 100, "遅くなった" if slower else ""))
+    return 1 if any(r[4] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+## モジュールを読み込むのにかかる時間を、毎回新しいPythonを起動して測る
+## 「前」は、tentoappが最初に全部読み込んでいたころと同じものを先に読み込んだ場合
+## 例: python bench_import.py --runs 20
+
+## 以前のtentoappが読み込んでいたもの
+EAGER = "import tkinter.font, inspect, re, tkinter.filedialog, tkinter.simpledialog, tkinter.messagebox, platform"
+
+CASES = [
+    ("tentoapp(前)", EAGER + "; import tentoapp"),
+    ("tentoapp", "import tentoapp"),
+    ("tentoapp(*)", "from tentoapp import *"),
+    ("market", "import market"),
+    ("headless", "import headless"),
+    ("server", "import server"),
+]
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+%s
+t = time.perf_counter() - t
+print(t, 'tkinter' in sys.modules, 'tkinter.font' in sys.modules)
+"""
+
+
+def measure(code, runs):
+    # ふだんと同じく.pycを使うように、書き込まない設定を外して1回目は捨てる
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    times = []
+    tk = False
+    font = False
+    for k in range(runs + 1):
+        out = subprocess.run([sys.executable, "-c", PROBE % code], capture_output=True, text=True,
+                             check=True, cwd=sys.path[0] or ".", env=env).stdout.split()
+        if k > 0:
+            times.append(float(out[0]))
+        tk = out[1] == "True"
+        font = out[2] == "True"
+    return times, tk, font
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="importにかかる時間")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出す")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, code in CASES:
+        times, tk, font = measure(code, args.runs)
+        results[name] = {"median_ms": statistics.median(times) * 1000,
+                         "min_ms": min(times) * 1000, "tkinter": tk, "tkinter.font": font}
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print("%-14s %10s %10s %8s %13s" % ("module", "median ms", "min ms", "tkinter", "tkinter.font"))
+    for name, r in results.items():
+        print("%-14s %10.1f %10.1f %8s %13s" % (name, r["median_ms"], r["min_ms"], r["tkinter"],
+                                                r["tkinter.font"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from market import PriceEngine
+from wire import Decoder, Encoder
+
+## wire.pyのバイナリ形式とJSONで、1tickあたりのバイト数と
+## encode/decodeの速さを比べる
+## 例: python bench_wire.py --ticks 2000
+
+
+## n銘柄の株価をticks回ぶん作る(銘柄ごとに別のqで動かす)
+def prices(n, ticks, seed=0):
+    rng = np.random.default_rng(seed)
+    waru = rng.choice([1, 2, 5], size=n)
+    engine = PriceEngine(rng.integers(1000, 10000, size=n), waru, np.full(n, 100))
+    rows = []
+    for _ in range(ticks):
+        engine.step(rng.integers(-10, 11, size=n))
+        rows.append(engine.kabuka.copy())
+    return rows
+
+
+def bench(n, ticks, keyframe):
+    rows = prices(n, ticks)
+
+    enc = Encoder(n, keyframe=keyframe)
+    start = time.perf_counter()
+    frames = [enc.encode(t + 1, k) for t, k in enumerate(rows)]
+    wire_enc = time.perf_counter() - start
+    dec = Decoder()
+    start = time.perf_counter()
+    for f in frames:
+        dec.decode(f)
+    wire_dec = time.perf_counter() - start
+    assert np.array_equal(dec.kabuka, rows[-1])
+
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    start = time.perf_counter()
+    texts = [dumps({"tick": t + 1, "kabuka": k.tolist()}).encode() for t, k in enumerate(rows)]
+    json_enc = time.perf_counter() - start
+    start = time.perf_counter()
+    for s in texts:
+        json.loads(s)
+    json_dec = time.perf_counter() - start
+
+    return {
+        "n": n,
+        "ticks": ticks,
+        "wire_bytes_per_tick": sum(len(f) for f in frames) / ticks,
+        "json_bytes_per_tick": sum(len(s) for s in texts) / ticks,
+        "wire_encode_per_sec": ticks / wire_enc,
+        "wire_decode_per_sec": ticks / wire_dec,
+        "json_encode_per_sec": ticks / json_enc,
+        "json_decode_per_sec": ticks / json_dec,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="tickのバイナリ形式とJSONの比較")
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--keyframe", type=int, default=100)
+    parser.add_argument("--n", type=int, nargs="*", default=[3, 100, 10000])
+    args = parser.parse_args(argv)
+
+    print("%6s %12s %12s %12s %12s %12s %12s" % ("n", "wire B/tick", "json B/tick",
+          "wire enc/s", "json enc/s", "wire dec/s", "json dec/s"))
+    for n in args.n:
+        r = bench(n, args.ticks, args.keyframe)
+        print("%6d %12.1f %12.1f %12.0f %12.0f %12.0f %12.0f" % (
+            n, r["wire_bytes_per_tick"], r["json_bytes_per_tick"],
+            r["wire_encode_per_sec"], r["json_encode_per_sec"],
+            r["wire_decode_per_sec"], r["json_decode_per_sec"]))
+
+
+if __name__ == "__main__":
+    main()
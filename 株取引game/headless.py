@@ -0,0 +1,116 @@
+import argparse
+import random
+import time
+
+from history import HistorySink
+from market import Market, Portfolio, sankabu
+from replay import Recorder
+from sink import ConsoleSink, FileSink, Sinks
+
+## 画面なしで株取引ゲームを最速で動かす
+## 例: python headless.py --seed 0 --ticks 10000 --policy random
+
+
+#== 売買の方針(policy)
+## policy(market, portfolio) は毎tickのx()と配当のあとに呼ばれる。
+## POLICIESには seed を受け取って policy を返す関数を登録する。
+
+def nanimosinai(seed):
+    return None
+
+def randam(seed):
+    # ゲームの乱数と同じ並びにならないようにずらす
+    rng = random.Random("random:%d" % seed)
+    def policy(market, portfolio):
+        i = rng.randrange(len(market))
+        if rng.random() < 0.5:
+            portfolio.buy(i)
+        else:
+            portfolio.sell(i)
+    return policy
+
+## 一番安い銘柄を毎tick1株ずつ買い、買値の1.5倍を超えたら全部売る
+def yasukau(seed):
+    kaine = {}
+    def policy(market, portfolio):
+        for i, kabuka in enumerate(market.kabuka.tolist()):
+            if portfolio.motika[i] > 0 and kabuka > kaine.get(i, kabuka) * 1.5:
+                portfolio.sell(i, portfolio.motika[i])
+        i = int(market.kabuka.argmin())
+        if market.kabuka[i] > 0 and portfolio.buy(i):
+            kaine[i] = int(market.kabuka[i])
+    return policy
+
+POLICIES = {
+    "none": nanimosinai,
+    "random": randam,
+    "yasukau": yasukau,
+}
+
+
+## sinkを渡すと毎tickと売買を記録する(sink.py)
+def run(seed=0, ticks=10000, policy="none", market=None, portfolio=None, sink=None):
+    if market is None:
+        market = Market(seed)
+    if portfolio is None:
+        portfolio = Portfolio(market)
+    if sink is not None:
+        portfolio.sink = sink
+    if isinstance(policy, str):
+        policy = POLICIES[policy](seed)
+    for _ in range(ticks):
+        market.x()
+        portfolio.haitou()
+        if sink is not None:
+            sink.tick(market, portfolio)
+        if policy is not None:
+            policy(market, portfolio)
+    if sink is not None:
+        sink.flush()
+    return market, portfolio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="株取引ゲームを画面なしで動かす")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="none")
+    parser.add_argument("--log", help="tickと売買を1行1件のJSONで書き出すファイル")
+    parser.add_argument("--history", help="tickごとの株価・持ち株・残金を追記する履歴ファイル")
+    parser.add_argument("--record", help="replay.pyで再生できるように乱数の状態と売買を記録するファイル")
+    parser.add_argument("--print", type=float, default=None, metavar="SEC",
+                        help="SEC秒に1回コンソールに表示する")
+    args = parser.parse_args(argv)
+
+    market = Market(args.seed)
+    portfolio = Portfolio(market)
+    sinks = []
+    recorder = None
+    if args.record:
+        recorder = Recorder(market, portfolio)
+        sinks.append(recorder)
+    if args.log:
+        sinks.append(FileSink(args.log))
+    if args.history:
+        # 書くtick数はわかっているので、その分の場所を先に取っておく
+        sinks.append(HistorySink(args.history, len(sankabu()), capacity=args.ticks))
+    if args.print is not None:
+        sinks.append(ConsoleSink(args.print))
+    sink = Sinks(*sinks) if sinks else None
+
+    start = time.perf_counter()
+    run(args.seed, args.ticks, args.policy, market, portfolio, sink)
+    elapsed = time.perf_counter() - start
+    if sink is not None:
+        sink.close()
+    if recorder is not None:
+        recorder.save(args.record)
+
+    print("株価は" + str(market.kabuka.tolist()))
+    print("持ち株は" + str(portfolio.motika.tolist()))
+    print("残金は" + str(portfolio.kane))
+    print("%d tick / %.3f 秒 (%.0f tick/秒)" % (market.tick, elapsed, market.tick / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import os
+import struct
+import time
+
+import numpy as np
+
+from sink import Sink
+
+## 株価の履歴ファイル(列ごとに並べたint64)
+## 64バイトのヘッダのあとに、列ごとにcapacity行ぶんの場所を取って並べる。
+## 列は[tick, 株価 x n, 持ち株 x n, 残金]の順なので、c番目の列の行rは
+##   HEADER_SIZE + (c * capacity + r) * 8
+## にある。1つの列はファイルの中でひと続きなので、何百万tickでもコピーせずに読める。
+##   ヘッダ  magic "KBHIST03", 銘柄数 u32, 0 u32, capacity u64, 書いた行数 u64
+## capacityを超えるときは、2倍の場所を取った新しいファイルに写してos.replace()で置きかえる
+## (開いている読む側は古いファイルをそのまま読める。refresh()で新しいほうを開き直す)。
+## 書いた行数はデータを書いたあとでヘッダに書くので、途中で落ちても書いた行数までは正しい。
+## 場所を取るのはtruncate()なので、書いていないところはディスクを使わない(使えるOSなら)。
+
+MAGIC = b"KBHIST03"
+HEADER = struct.Struct("<8sIIQQ")
+ROWS = struct.Struct("<Q")
+ROWS_OFFSET = 24
+HEADER_SIZE = 64
+
+
+def _header(path):
+    with open(path, "rb") as f:
+        magic, n, _, capacity, rows = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(path + "は履歴ファイルではありません")
+    return n, capacity, rows
+
+
+## 書き込み用。Sinkなのでheadless.run(sink=...)にそのまま渡せる
+## block tickぶんはnumpyの配列にためておき、いっぱいになったとき、
+## またはinterval秒たったときにファイルへ書く(読む側にはそこから見える)。
+## 何tick書くかわかっていれば、capacityにその数を渡すと途中で写しなおさずに済む。
+class HistorySink(Sink):
+
+    def __init__(self, path, n, block=4096, interval=1.0, capacity=1 << 16):
+        self.path = path
+        self.n = n
+        self.width = 2 * n + 2
+        self.block = block
+        self.interval = interval
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            old_n, self.capacity, self.rows = _header(path)
+            if old_n != n:
+                raise ValueError(path + "は銘柄数の違う履歴ファイルです")
+            self.file = open(path, "r+b")
+        else:
+            self.capacity = max(1, capacity)
+            self.rows = 0  # ファイルに書いた行数
+            self.file = self.__create(path, self.capacity)
+        self.buffer = np.zeros((self.width, block), dtype=np.int64)
+        self.row = 0  # bufferにためている行数
+        self.last = time.monotonic()
+
+    ## ヘッダを書き、capacity行ぶんの場所を取ったファイルを開く
+    def __create(self, path, capacity):
+        f = open(path, "w+b")
+        f.write(HEADER.pack(MAGIC, self.n, 0, capacity, self.rows).ljust(HEADER_SIZE, b"\0"))
+        f.truncate(HEADER_SIZE + self.width * capacity * 8)
+        return f
+
+    def tick(self, market, portfolio):
+        n = self.n
+        r = self.row
+        buf = self.buffer
+        buf[0, r] = market.tick
+        buf[1:1 + n, r] = market.kabuka
+        buf[1 + n:1 + 2 * n, r] = portfolio.motika
+        buf[-1, r] = portfolio.kane
+        self.row = r + 1
+        if self.row == self.block:
+            self.flush()
+        elif time.monotonic() - self.last >= self.interval:
+            self.flush()
+
+    ## capacityをrows行以上(2倍ずつ)にした新しいファイルに写して置きかえる
+    def __grow(self, rows):
+        capacity = self.capacity
+        while capacity < rows:
+            capacity *= 2
+        old = np.memmap(self.path, dtype=np.int64, mode="r", offset=HEADER_SIZE,
+                        shape=(self.width, self.capacity))
+        tmp = self.path + ".tmp"
+        f = self.__create(tmp, capacity)
+        for c in range(self.width):
+            f.seek(HEADER_SIZE + c * capacity * 8)
+            f.write(old[c, :self.rows].tobytes())
+        del old
+        f.flush()
+        self.file.close()
+        f.close()
+        os.replace(tmp, self.path)
+        self.file = open(self.path, "r+b")
+        self.capacity = capacity
+
+    def flush(self):
+        self.last = time.monotonic()
+        r = self.row
+        if r == 0:
+            return
+        if self.rows + r > self.capacity:
+            self.__grow(self.rows + r)
+        f = self.file
+        for c in range(self.width):
+            f.seek(HEADER_SIZE + (c * self.capacity + self.rows) * 8)
+            f.write(self.buffer[c, :r].tobytes())
+        f.flush()
+        self.rows += r
+        f.seek(ROWS_OFFSET)
+        f.write(ROWS.pack(self.rows))
+        f.flush()
+        self.row = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+## 読み込み用
+## columnsは(列数, capacity)のmemmap。どの列も書いた行数までのひと続きのviewを返すのでコピーしない。
+class History():
+
+    def __init__(self, path):
+        self.path = path
+        self.refresh()
+
+    ## 開いたあとに追記された行も読めるようにする
+    def refresh(self):
+        n, capacity, rows = _header(self.path)
+        self.n = n
+        self.width = 2 * n + 2
+        self.capacity = capacity
+        self.rows = rows
+        self.columns = np.memmap(self.path, dtype=np.int64, mode="r", offset=HEADER_SIZE,
+                                 shape=(self.width, capacity))
+
+    def __len__(self):
+        return self.rows
+
+    ## c番目の列
+    def column(self, c):
+        return self.columns[c, :self.rows]
+
+    @property
+    def tick(self):
+        return self.column(0)
+
+    ## i番目の銘柄の株価の列。iを省くと(tick数, n)のview
+    def kabuka(self, i=None):
+        if i is None:
+            return self.columns[1:1 + self.n, :self.rows].T
+        return self.column(1 + i)
+
+    def motika(self, i=None):
+        if i is None:
+            return self.columns[1 + self.n:1 + 2 * self.n, :self.rows].T
+        return self.column(1 + self.n + i)
+
+    @property
+    def kane(self):
+        return self.column(self.width - 1)
@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from server import LENGTH, raise_nofile
+from wire import MAGIC, Decoder
+
+## server.pyに大量のクライアントをつないで、tickが届くまでの時間を測る
+## 例: python loadgen.py --clients 1000 --duration 20 --spawn
+##     python loadgen.py --clients 10000 --duration 30 --spawn --interval 0.5
+##     python loadgen.py --clients 1000 --duration 20 --spawn --binary
+
+
+class Stats():
+
+    def __init__(self):
+        self.latency = []  # tickを送った時刻から受け取るまで(秒)
+        self.ticks = 0
+        self.fills = 0
+        self.errors = 0
+        self.connected = 0
+        self.failed = 0
+
+
+## 1メッセージ読む。binaryならwire.pyのtickはDecoderで読んで(tick, 送った時刻)にする
+async def receive(reader, binary, decoder):
+    if not binary:
+        line = await reader.readline()
+        if not line:
+            return None
+        return json.loads(line)
+    head = await reader.readexactly(LENGTH.size)
+    data = await reader.readexactly(LENGTH.unpack(head)[0])
+    if data[0] == MAGIC:
+        decoder.decode(data)
+        return {"type": "tick", "tick": decoder.tick, "ts": decoder.ts}
+    return json.loads(data)
+
+
+async def client(host, port, stats, stop, orders, n, binary=False):
+    decoder = Decoder()
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        hello = await receive(reader, binary, decoder)
+    except (OSError, ValueError, asyncio.IncompleteReadError):
+        stats.failed += 1
+        return
+    stats.connected += 1
+    decoder.reset(hello["tick"], hello["kabuka"])
+    rng = random.Random(hello["id"])
+    try:
+        while not stop.is_set():
+            msg = await receive(reader, binary, decoder)
+            if msg is None:
+                break
+            now = time.time()
+            kind = msg["type"]
+            if kind == "tick" or kind == "key":
+                stats.latency.append(now - msg["ts"])
+                stats.ticks += 1
+                # tickごとにordersの確率で1株注文する
+                if orders > 0 and rng.random() < orders:
+                    op = "buy" if rng.random() < 0.5 else "sell"
+                    writer.write((json.dumps({"op": op, "i": rng.randrange(n), "qty": 1}) + "\n").encode())
+            elif kind == "fill":
+                stats.fills += 1
+            elif kind == "error":
+                stats.errors += 1
+    except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def run(host, port, clients, duration, orders, warmup, binary=False):
+    stats = Stats()
+    stop = asyncio.Event()
+    tasks = []
+    # 一度につなぎすぎるとlistenのbacklogからあふれるので少しずつつなぐ
+    for k in range(clients):
+        tasks.append(asyncio.create_task(client(host, port, stats, stop, orders, 3, binary)))
+        if k % 200 == 199:
+            await asyncio.sleep(0.05)
+    await asyncio.sleep(warmup)
+    stats.latency.clear()
+    stats.ticks = 0
+    await asyncio.sleep(duration)
+    stop.set()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="server.pyの負荷試験")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0, help="測る秒数")
+    parser.add_argument("--warmup", type=float, default=2.0, help="つないでから測り始めるまでの秒数")
+    parser.add_argument("--orders", type=float, default=0.1, help="1tickあたり1クライアントが注文する確率")
+    parser.add_argument("--spawn", action="store_true", help="server.pyを別プロセスで起動する")
+    parser.add_argument("--binary", action="store_true", help="サーバがbinaryで送るとき")
+    parser.add_argument("--interval", type=float, default=1.0, help="--spawnしたサーバの1tickの秒数")
+    args = parser.parse_args(argv)
+
+    raise_nofile()
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, "server.py", "--host", args.host,
+                                   "--port", str(args.port), "--interval", str(args.interval)]
+                                  + (["--binary"] if args.binary else []),
+                                  cwd=sys.path[0] or ".")
+        time.sleep(1.0)
+    try:
+        stats = asyncio.run(run(args.host, args.port, args.clients, args.duration, args.orders,
+                                args.warmup, args.binary))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    lat = sorted(stats.latency)
+    result = {
+        "clients": args.clients,
+        "connected": stats.connected,
+        "failed": stats.failed,
+        "ticks_received": stats.ticks,
+        "fills": stats.fills,
+        "errors": stats.errors,
+        "latency_ms": {p: percentile(lat, float(p[1:])) * 1000 for p in ("p50", "p90", "p99", "p100")},
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import random
+from array import array
+
+import numpy as np
+
+## 売り買い
+KAU = "kau"
+URU = "uru"
+
+## 株価エンジン
+## 銘柄ごとの株価・変動の割る数・0以下になったときの戻り値を配列で持ち、
+## 1tickで全銘柄をまとめて動かす。
+class PriceEngine():
+
+    def __init__(self, kabuka, waru, reset):
+        self.kabuka = np.array(kabuka, dtype=np.int64)
+        self.waru = np.array(waru, dtype=np.float64)
+        self.reset = np.array(reset, dtype=np.int64)
+        if not (self.kabuka.shape == self.waru.shape == self.reset.shape):
+            raise ValueError("kabuka, waru, resetの長さが違います")
+        self.__ikiteru = np.empty(len(self.kabuka), dtype=bool)
+        # 銘柄ごとに0以下になって戻された(倒産した)回数
+        self.resets = np.zeros(len(self.kabuka), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.kabuka)
+
+    ## qは全銘柄共通のint、または銘柄ごとの配列
+    def step(self, q):
+        q = np.asarray(q, dtype=np.int64)
+        # int((q*q*q)/k) と同じく0方向へ切り捨て
+        delta = np.trunc((q * q * q) / self.waru).astype(np.int64)
+        ikiteru = np.greater(self.kabuka, 0, out=self.__ikiteru)
+        np.add(self.kabuka, delta, out=self.kabuka, where=ikiteru)
+        np.copyto(self.kabuka, self.reset, where=~ikiteru)
+        self.resets += ~ikiteru
+        return self.kabuka
+
+    ## 持ち株に対する配当(株価の0.0005倍を銘柄ごとに四捨五入)
+    def haitou(self, motika):
+        motika = np.asarray(motika, dtype=np.int64)
+        return int(np.round(motika * self.kabuka * 0.0005).sum())
+
+
+## 株取引ゲームの3銘柄
+def sankabu():
+    return PriceEngine(kabuka=(1000, 5000, 10000),
+                       waru=(5, 2, 1),
+                       reset=(100, 200, 200))
+
+
+
+## 市場(全プレイヤーで共有する)
+## 株価エンジンと乱数を持ち、x()で1tick進める。
+class Market():
+    __slots__ = ("engine", "rng", "q", "tick")
+
+    def __init__(self, seed=None, engine=None):
+        self.engine = sankabu() if engine is None else engine
+        self.rng = random.Random(seed)
+        self.q = 0
+        self.tick = 0
+
+    def __len__(self):
+        return len(self.engine)
+
+    @property
+    def kabuka(self):
+        return self.engine.kabuka
+
+    ## 1tick進める(株価の変動)
+    def x(self):
+        self.q = self.rng.randint(-10, 10)
+        self.tick += 1
+        return self.engine.step(self.q)
+
+
+## プレイヤー1人分の口座
+## 持ち株はarray("q")で持つので、1人あたりのメモリが小さく一定。
+## sinkを入れておくと売買のたびにsink.trade()が呼ばれる(sink.py)
+class Portfolio():
+    __slots__ = ("market", "kane", "motika", "sink")
+
+    def __init__(self, market, kane=20000, sink=None):
+        self.market = market
+        self.kane = kane
+        self.motika = array("q", bytes(8 * len(market)))
+        self.sink = sink
+
+    ## 配当を受け取る。Market.x()のあとに呼ぶ
+    def haitou(self):
+        self.kane = self.kane + self.market.engine.haitou(self.motika)
+
+    ## 資産額(残金+持ち株の時価)
+    def value(self):
+        return self.kane + int(np.dot(self.motika, self.market.kabuka))
+
+    ## i番目の銘柄を最大何株買えるか(残金 >= 株価 を満たす株数)
+    ## 株価が0以下のときは上限がなくなるので0株とする
+    def kaeru(self, i, kabuka=None):
+        if kabuka is None:
+            kabuka = int(self.market.kabuka[i])
+        if kabuka > 0:
+            return self.kane // kabuka
+        else:
+            return 0
+
+    ## i番目の銘柄をqty株買う。買えたらTrue
+    ## kaeru()と同じく、株価が0以下のときは買えない(OrderQueue.match()と同じ決まり)
+    def buy(self, i, qty=1):
+        kabuka = int(self.market.kabuka[i])
+        if qty > 0 and kabuka > 0 and self.kane >= kabuka * qty:
+            self.kane = self.kane - kabuka * qty
+            self.motika[i] = self.motika[i] + qty
+            if self.sink is not None:
+                self.sink.trade(self, i, KAU, qty, kabuka)
+            return True
+        else:
+            return False
+
+    ## i番目の銘柄をqty株売る。売れたらTrue
+    def sell(self, i, qty=1):
+        if qty > 0 and self.motika[i] >= qty:
+            kabuka = int(self.market.kabuka[i])
+            self.kane = self.kane + kabuka * qty
+            self.motika[i] = self.motika[i] - qty
+            if self.sink is not None:
+                self.sink.trade(self, i, URU, qty, kabuka)
+            return True
+        else:
+            return False
+
+
+#== 注文
+
+## 1件の注文。qtyがNoneなら買えるだけ/持っているだけ全部
+## match()のあとfilledに約定した株数、priceに約定した株価が入る
+class Order():
+    __slots__ = ("portfolio", "i", "side", "qty", "filled", "price")
+
+    def __init__(self, portfolio, i, side, qty=None):
+        if side not in (KAU, URU):
+            raise ValueError("sideはKAUかURUです")
+        if qty is not None and qty < 0:
+            raise ValueError("qtyは0以上です")
+        self.portfolio = portfolio
+        self.i = i
+        self.side = side
+        self.qty = qty
+        self.filled = 0
+        self.price = None
+
+
+## 注文をためておき、match()でそのtickの株価でまとめて約定させる
+## 買えない分・持っていない分は約定しない(一部だけの約定あり)
+class OrderQueue():
+
+    def __init__(self, market):
+        self.market = market
+        self.orders = []
+
+    def __len__(self):
+        return len(self.orders)
+
+    def submit(self, order):
+        self.orders.append(order)
+        return order
+
+    def buy(self, portfolio, i, qty=None):
+        return self.submit(Order(portfolio, i, KAU, qty))
+
+    def sell(self, portfolio, i, qty=None):
+        return self.submit(Order(portfolio, i, URU, qty))
+
+    ## 銘柄ごとの株数の並び(Noneは全部、0は注文しない)をまとめて注文する
+    def bulk(self, portfolio, side, qtys):
+        orders = []
+        for i, qty in enumerate(qtys):
+            if qty is None or qty > 0:
+                orders.append(Order(portfolio, i, side, qty))
+        self.orders.extend(orders)
+        return orders
+
+    ## portfolioのまだ約定していない注文を取り消し、取り消した数を返す
+    def cancel(self, portfolio):
+        n = len(self.orders)
+        self.orders = [o for o in self.orders if o.portfolio is not portfolio]
+        return n - len(self.orders)
+
+    ## たまっている注文を出した順に約定させ、約定させた注文のリストを返す
+    def match(self):
+        kabuka = self.market.kabuka.tolist()
+        orders = self.orders
+        self.orders = []
+        for o in orders:
+            p = o.portfolio
+            price = kabuka[o.i]
+            if o.side == KAU:
+                n = p.kaeru(o.i, price)
+                if o.qty is not None and o.qty < n:
+                    n = o.qty
+                if n > 0:
+                    p.kane = p.kane - price * n
+                    p.motika[o.i] = p.motika[o.i] + n
+            else:
+                n = p.motika[o.i]
+                if o.qty is not None and o.qty < n:
+                    n = o.qty
+                if n > 0:
+                    p.kane = p.kane + price * n
+                    p.motika[o.i] = p.motika[o.i] - n
+            o.filled = max(n, 0)
+            o.price = price
+            if n > 0 and p.sink is not None:
+                p.sink.trade(p, o.i, o.side, n, price)
+        return orders
@@ -0,0 +1,135 @@
+import argparse
+import bisect
+import json
+from array import array
+
+from market import KAU, Market, Portfolio, PriceEngine
+from sink import Sink
+
+## 記録と再生
+## 結果は乱数(q)の並びと売買だけで決まるので、乱数の状態と売買を記録しておけば
+## 同じセッションを何度でも最速で再現できる。
+## every tickごとに状態を丸ごと残しておき、N tick目へ飛ぶときは
+## その手前の状態から再生する。
+
+VERSION = 1
+
+
+## 市場と口座の状態をJSONにできる形で取り出す
+def snapshot(market, portfolio):
+    version, state, gauss = market.rng.getstate()
+    return {
+        "tick": market.tick,
+        "q": market.q,
+        "kabuka": market.kabuka.tolist(),
+        "resets": market.engine.resets.tolist(),
+        "rng": [version, list(state), gauss],
+        "kane": portfolio.kane,
+        "motika": portfolio.motika.tolist(),
+    }
+
+## snapshot()の状態から市場と口座を作り直す
+def restore(snap, waru, reset):
+    engine = PriceEngine(snap["kabuka"], waru, reset)
+    engine.resets[:] = snap["resets"]
+    market = Market(engine=engine)
+    version, state, gauss = snap["rng"]
+    market.rng.setstate((version, tuple(state), gauss))
+    market.q = snap["q"]
+    market.tick = snap["tick"]
+    portfolio = Portfolio(market, kane=snap["kane"])
+    portfolio.motika = array("q", snap["motika"])
+    return market, portfolio
+
+
+## 記録用のsink
+## portfolio.sinkとheadless.run(sink=...)の両方に渡して使う
+class Recorder(Sink):
+
+    def __init__(self, market, portfolio, every=1000):
+        self.every = every
+        self.waru = market.engine.waru.tolist()
+        self.reset = market.engine.reset.tolist()
+        self.trades = []
+        self.snapshots = [snapshot(market, portfolio)]
+
+    def tick(self, market, portfolio):
+        if market.tick % self.every == 0:
+            self.snapshots.append(snapshot(market, portfolio))
+
+    def trade(self, portfolio, i, side, qty, price):
+        self.trades.append((portfolio.market.tick, i, side, qty, price))
+
+    def save(self, path):
+        data = {"version": VERSION, "waru": self.waru, "reset": self.reset,
+                "trades": self.trades, "snapshots": self.snapshots}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+
+## 再生用
+class Replayer():
+
+    def __init__(self, waru, reset, trades, snapshots):
+        self.waru = waru
+        self.reset = reset
+        self.trades = trades
+        self.trade_ticks = [t[0] for t in trades]
+        self.snapshots = snapshots
+        self.snapshot_ticks = [s["tick"] for s in snapshots]
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data["version"] != VERSION:
+            raise ValueError("記録のバージョンが違います: " + str(data["version"]))
+        return cls(data["waru"], data["reset"], data["trades"], data["snapshots"])
+
+    @classmethod
+    def from_recorder(cls, recorder):
+        return cls(recorder.waru, recorder.reset, list(recorder.trades), list(recorder.snapshots))
+
+    def __apply(self, market, portfolio, t):
+        lo = bisect.bisect_left(self.trade_ticks, t)
+        hi = bisect.bisect_right(self.trade_ticks, t)
+        for _, i, side, qty, price in self.trades[lo:hi]:
+            if int(market.kabuka[i]) != price:
+                raise ValueError("%d tick目の株%dの株価が記録と違います(%d != %d)"
+                                 % (t, i + 1, int(market.kabuka[i]), price))
+            if side == KAU:
+                portfolio.kane = portfolio.kane - price * qty
+                portfolio.motika[i] = portfolio.motika[i] + qty
+            else:
+                portfolio.kane = portfolio.kane + price * qty
+                portfolio.motika[i] = portfolio.motika[i] - qty
+
+    ## tick目の売買まで終わった状態の(market, portfolio)を返す
+    def seek(self, tick):
+        k = bisect.bisect_right(self.snapshot_ticks, tick) - 1
+        if k < 0:
+            raise ValueError(str(tick) + " tick目より前の記録はありません")
+        market, portfolio = restore(self.snapshots[k], self.waru, self.reset)
+        self.__apply(market, portfolio, market.tick)
+        while market.tick < tick:
+            market.x()
+            portfolio.haitou()
+            self.__apply(market, portfolio, market.tick)
+        return market, portfolio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="記録したセッションを再生する")
+    parser.add_argument("record")
+    parser.add_argument("--tick", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    market, portfolio = Replayer.load(args.record).seek(args.tick)
+    print(str(market.tick) + " tick目")
+    print("株価は" + str(market.kabuka.tolist()))
+    print("持ち株は" + str(portfolio.motika.tolist()))
+    print("残金は" + str(portfolio.kane))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import time
+
+## Tkを使わないので、Tkのない環境(headless, server)からも読み込める。
+## windowはafter()とafter_cancel()を持っていれば何でもよい。
+
+## 時刻の格子を1つ進める
+## nxtに呼ぶはずだったものをnowに呼んだとき、(次に呼ぶ時刻, 過ぎた回数(今回を含む))を返す。
+## 間に合わなかった回はまとめて飛ばし、次の時刻はいつも nxt + period x n の上に置くので、
+## 処理にかかった時間で遅れがたまらない。Scheduler, MarketWorker, MarketServerで使う
+def advance(nxt, now, period):
+    due = 1 + int(max(0.0, now - nxt) // period)
+    return nxt + due * period, due
+
+
+#== Scheduler
+## after()で自分を呼び直すと、処理にかかった時間のぶんだけ少しずつ遅れていく。
+## Schedulerは「開始時刻 + 間隔 x n」の時刻を目指して呼ぶので遅れがたまらない。
+## 間に合わなかった回はまとめて1回にし(coalesce)、遅れた時間を記録する。
+class Job():
+
+    def __init__(self, scheduler, interval, func, coalesce=True, maxburst=100):
+        self.scheduler = scheduler
+        self.interval = interval  # ミリ秒(speed=1のとき)
+        self.func = func
+        self.coalesce = coalesce  # Falseなら間に合わなかった回数ぶん(maxburstまで)続けて呼ぶ
+        self.maxburst = maxburst
+        self.name = getattr(func, "__name__", repr(func))
+        # after()はこれをコールバックの名前にするので、Profilerにはfuncの名前で出る
+        self.__name__ = self.name
+        self.next = None   # 次に呼ぶ時刻(perf_counterの秒)
+        self.left = None   # 止めたときの残り時間(speed=1での秒)
+        self.after_id = None
+        self.runs = 0
+        self.missed = 0
+        self.late = 0.0    # 直近の遅れ(秒)
+        self.maxlate = 0.0
+        self.totallate = 0.0
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+    def __call__(self):
+        self.scheduler._run(self)
+
+    def report(self):
+        return {"name": self.name, "runs": self.runs, "missed": self.missed,
+                "late_ms": self.late * 1000, "max_late_ms": self.maxlate * 1000,
+                "mean_late_ms": (self.totallate / self.runs * 1000) if self.runs else 0.0}
+
+
+class Scheduler():
+
+    MAXSPEED = 1000
+
+    def __init__(self, window):
+        self.window = window
+        self.jobs = []
+        self.__speed = 1.0
+
+    ## interval ミリ秒ごとにfuncを呼ぶ
+    def every(self, interval, func, coalesce=True, maxburst=100):
+        job = Job(self, interval, func, coalesce, maxburst)
+        self.jobs.append(job)
+        if self.__speed > 0:
+            job.next = time.perf_counter() + self.__period(job)
+            self.__arm(job)
+        else:
+            job.left = interval / 1000
+        return job
+
+    def cancel(self, job):
+        if job.after_id is not None:
+            self.window.after_cancel(job.after_id)
+            job.after_id = None
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    ## 速さの倍率。0で一時停止、最大MAXSPEED倍
+    @property
+    def speed(self):
+        return self.__speed
+
+    @speed.setter
+    def speed(self, speed):
+        if speed < 0 or speed > Scheduler.MAXSPEED:
+            raise ValueError("speedは0から" + str(Scheduler.MAXSPEED) + "までです")
+        now = time.perf_counter()
+        for job in self.jobs:
+            # 次の回までの残りを、今の速さからspeed=1での時間に直しておく
+            if job.next is not None:
+                job.left = max(0.0, job.next - now) * self.__speed
+                job.next = None
+            if job.after_id is not None:
+                self.window.after_cancel(job.after_id)
+                job.after_id = None
+        self.__speed = speed
+        if speed > 0:
+            for job in self.jobs:
+                job.next = now + job.left / speed
+                job.left = None
+                self.__arm(job)
+
+    @property
+    def paused(self):
+        return self.__speed == 0
+
+    def report(self):
+        return [job.report() for job in self.jobs]
+
+    def __period(self, job):
+        return job.interval / 1000 / self.__speed
+
+    def __arm(self, job):
+        delay = max(0, int((job.next - time.perf_counter()) * 1000))
+        job.after_id = self.window.after(delay, job)
+
+    def _run(self, job):
+        job.after_id = None
+        now = time.perf_counter()
+        period = self.__period(job)
+        late = max(0.0, now - job.next)
+        nxt, due = advance(job.next, now, period)
+        job.late = late
+        job.maxlate = max(job.maxlate, late)
+        job.totallate += late
+        if job.coalesce:
+            calls = 1
+        else:
+            calls = min(due, job.maxburst)
+        job.missed += due - calls
+        job.next = nxt
+        for _ in range(calls):
+            job.runs += 1
+            job.func()
+            if job not in self.jobs or self.__speed == 0:
+                return
+        if job.after_id is None and job.next is not None:
+            self.__arm(job)
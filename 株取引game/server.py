@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import struct
+import time
+
+from market import KAU, URU, Market, Order, OrderQueue, Portfolio
+from scheduler import advance
+from wire import Encoder
+
+## みんなで同じ市場を使う株取引ゲームのサーバ(asyncio, TCP)
+## 1行1つのJSONでやりとりする。
+##  サーバ→クライアント
+##   {"type":"hello","id":番号,"tick":..,"kabuka":[..],"kane":..,"motika":[..]}
+##   {"type":"tick","tick":..,"ts":送った時刻,"d":[[銘柄,株価],..]}   変わった株価だけ
+##   {"type":"key","tick":..,"ts":..,"kabuka":[..]}                  keyframe tickごとに全部
+##   {"type":"fill","i":..,"side":..,"qty":..,"filled":..,"price":..,"kane":..,"motika":[..]}
+##   {"type":"error","message":..}
+##  クライアント→サーバ
+##   {"op":"buy"または"sell","i":銘柄,"qty":株数(省くと買えるだけ/全部)}
+## --binaryのときは、どのメッセージも先頭に長さ(u32 little endian)をつけて送り、
+## tickとkeyはwire.pyのバイナリ形式(送った時刻つき)、それ以外はJSONのまま送る。
+## 注文は全員ぶんを1つのOrderQueueにためて、tickごとにその株価でまとめて約定させる。
+## 買える/売れるの決まりはko()/ur()と同じ(残金 >= 株価、持ち株 > 0)。
+
+## 送りきれずにたまったデータがこれを超えたクライアントは切る
+MAXBUFFER = 1 << 20
+
+## 1つのクライアントが1tickのあいだにためられる注文の数
+MAXORDERS = 100
+
+## --binaryのときのメッセージの長さ
+LENGTH = struct.Struct("<I")
+
+
+class Client():
+    __slots__ = ("id", "writer", "portfolio", "queued")
+
+    def __init__(self, id, writer, portfolio):
+        self.id = id
+        self.writer = writer
+        self.portfolio = portfolio
+        self.queued = 0  # このtickにためた注文の数
+
+
+class MarketServer():
+
+    def __init__(self, market, interval=1.0, keyframe=100, kane=20000, binary=False):
+        self.market = market
+        self.interval = interval
+        self.keyframe = keyframe
+        self.kane = kane
+        self.binary = binary
+        self.encoder = Encoder(len(market), keyframe, timestamp=True) if binary else None
+        self.orders = OrderQueue(market)
+        self.clients = {}
+        self.count = 0
+        self.prev = market.kabuka.tolist()
+
+    ## JSONのメッセージを送る形にする
+    def __pack(self, msg):
+        if self.binary:
+            data = json.dumps(msg, ensure_ascii=False, separators=(",", ":")).encode()
+            return LENGTH.pack(len(data)) + data
+        return (json.dumps(msg, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+
+    def __send(self, client, data):
+        if client.id not in self.clients:
+            return
+        w = client.writer
+        if w.transport.get_write_buffer_size() > MAXBUFFER:
+            # 読まないクライアントはclose()では送り終わるまで切れないので、すぐに切る
+            self.__drop(client)
+            w.transport.abort()
+            return
+        w.write(data)
+
+    ## クライアントを外し、まだ約定していない注文を取り消す(2回呼んでもよい)
+    def __drop(self, client):
+        if self.clients.pop(client.id, None) is not None:
+            self.orders.cancel(client.portfolio)
+
+    async def handle(self, reader, writer):
+        self.count += 1
+        client = Client(self.count, writer, Portfolio(self.market, kane=self.kane))
+        self.clients[client.id] = client
+        p = client.portfolio
+        hello = {"type": "hello", "id": client.id, "tick": self.market.tick,
+                 "kabuka": self.market.kabuka.tolist(), "kane": p.kane, "motika": p.motika.tolist()}
+        writer.write(self.__pack(hello))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if client.id not in self.clients:
+                    break
+                error = self.__order(client, line)
+                if error is not None:
+                    self.__send(client, self.__pack({"type": "error", "message": error}))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            # 1行がStreamReaderのlimit(64KiB)を超えた。読めないので切る
+            pass
+        finally:
+            # 切れたクライアントの注文は約定させない
+            self.__drop(client)
+            writer.close()
+
+    def __order(self, client, line):
+        try:
+            msg = json.loads(line)
+            side = {"buy": KAU, "sell": URU}[msg["op"]]
+            i = msg["i"]
+            qty = msg.get("qty")
+        except (ValueError, KeyError, TypeError):
+            return "注文が読めません"
+        # JSONのtrue/falseはPythonではintのなかまなので、はじく
+        if not isinstance(i, int) or isinstance(i, bool) or not 0 <= i < len(self.market):
+            return "銘柄がありません"
+        if qty is not None and (not isinstance(qty, int) or isinstance(qty, bool) or qty < 0):
+            return "株数が正しくありません"
+        if client.queued >= MAXORDERS:
+            return "このtickの注文が多すぎます"
+        client.queued += 1
+        self.orders.submit(Order(client.portfolio, i, side, qty))
+        return None
+
+    ## 1tick: 株価を動かし、配当を払い、変わった株価を配り、注文を約定させる
+    def tick(self):
+        m = self.market
+        m.x()
+        for client in self.clients.values():
+            client.portfolio.haitou()
+            # ためた注文はこのtickで約定させるので、数え直す
+            client.queued = 0
+
+        kabuka = m.kabuka.tolist()
+        if self.binary:
+            frame = self.encoder.encode(m.tick, kabuka, ts=time.time())
+            data = LENGTH.pack(len(frame)) + frame
+        elif m.tick % self.keyframe == 0:
+            data = self.__pack({"type": "key", "tick": m.tick, "ts": time.time(), "kabuka": kabuka})
+        else:
+            d = [[i, k] for i, (k, old) in enumerate(zip(kabuka, self.prev)) if k != old]
+            data = self.__pack({"type": "tick", "tick": m.tick, "ts": time.time(), "d": d})
+        self.prev = kabuka
+        for client in list(self.clients.values()):
+            self.__send(client, data)
+
+        owners = {id(c.portfolio): c for c in self.clients.values()}
+        for o in self.orders.match():
+            client = owners.get(id(o.portfolio))
+            if client is None:
+                continue
+            p = o.portfolio
+            fill = {"type": "fill", "i": o.i, "side": o.side, "qty": o.qty, "filled": o.filled,
+                    "price": o.price, "kane": p.kane, "motika": p.motika.tolist()}
+            self.__send(client, self.__pack(fill))
+
+    ## interval秒ごとにtick()(scheduler.advance()で時刻の格子に合わせる)
+    async def ticker(self):
+        loop = asyncio.get_running_loop()
+        nxt = loop.time() + self.interval
+        while True:
+            await asyncio.sleep(max(0.0, nxt - loop.time()))
+            self.tick()
+            nxt, _ = advance(nxt, loop.time(), self.interval)
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        ticker = asyncio.create_task(self.ticker())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            ticker.cancel()
+
+
+## たくさん接続できるように、開けるファイルの数をできるだけ増やす
+def raise_nofile():
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="株取引ゲームのサーバ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=1.0, help="1tickの秒数")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--binary", action="store_true", help="tickをwire.pyのバイナリ形式で送る")
+    args = parser.parse_args(argv)
+
+    raise_nofile()
+    server = MarketServer(Market(args.seed), args.interval, binary=args.binary)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import json
+import sys
+import time
+from collections import deque
+
+from market import KAU
+
+## tickと売買の記録先(sink)
+## tick()はheadless.run()などから、trade()はPortfolio.sinkとして売買のたびに呼ばれる。
+## イベントはタプルで持つ
+##   ("tick", tick, q, 株価のリスト, 持ち株のリスト, 残金)
+##   ("trade", tick, 銘柄, KAU/URU, 株数, 株価, 残金)
+
+
+def tick_event(market, portfolio):
+    return ("tick", market.tick, market.q, market.kabuka.tolist(),
+            portfolio.motika.tolist(), portfolio.kane)
+
+def trade_event(portfolio, i, side, qty, price):
+    return ("trade", portfolio.market.tick, i, side, qty, price, portfolio.kane)
+
+
+## 何もしないsink。これを継承して必要なものだけ書く
+class Sink():
+
+    def tick(self, market, portfolio):
+        pass
+
+    def trade(self, portfolio, i, side, qty, price):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+## 複数のsinkにまとめて流す
+class Sinks(Sink):
+
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+
+    def tick(self, market, portfolio):
+        for s in self.sinks:
+            s.tick(market, portfolio)
+
+    def trade(self, portfolio, i, side, qty, price):
+        for s in self.sinks:
+            s.trade(portfolio, i, side, qty, price)
+
+    def flush(self):
+        for s in self.sinks:
+            s.flush()
+
+    def close(self):
+        for s in self.sinks:
+            s.close()
+
+
+## 最新のmaxlen件だけをメモリに残す
+class RingSink(Sink):
+
+    def __init__(self, maxlen=10000):
+        self.events = deque(maxlen=maxlen)
+
+    def tick(self, market, portfolio):
+        self.events.append(tick_event(market, portfolio))
+
+    def trade(self, portfolio, i, side, qty, price):
+        self.events.append(trade_event(portfolio, i, side, qty, price))
+
+
+## 1行1イベントのJSONでファイルに書く
+## batch件たまるまでメモリに置いておき、まとめて書き出す
+class FileSink(Sink):
+
+    def __init__(self, path, batch=4096):
+        self.file = open(path, "a", encoding="utf-8")
+        self.batch = batch
+        self.buffer = []
+
+    def __append(self, event):
+        self.buffer.append(event)
+        if len(self.buffer) >= self.batch:
+            self.flush()
+
+    def tick(self, market, portfolio):
+        self.__append(tick_event(market, portfolio))
+
+    def trade(self, portfolio, i, side, qty, price):
+        self.__append(trade_event(portfolio, i, side, qty, price))
+
+    def flush(self):
+        if self.buffer:
+            dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+            self.file.write("\n".join(dumps(e) for e in self.buffer) + "\n")
+            self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+## コンソールに表示する
+## tickはinterval秒に1回まで、売買はinterval秒あたりmaxtrades件までに間引き、
+## 間引いた売買は次のtickの表示で件数だけ出す
+class ConsoleSink(Sink):
+
+    def __init__(self, interval=1.0, maxtrades=10, out=None):
+        self.interval = interval
+        self.maxtrades = maxtrades
+        self.out = sys.stdout if out is None else out
+        self.last = None
+        self.window = None
+        self.trades = 0
+        self.skipped = 0
+
+    def tick(self, market, portfolio):
+        now = time.monotonic()
+        if self.last is not None and now - self.last < self.interval:
+            return
+        self.last = now
+        lines = []
+        for i, kabuka in enumerate(market.kabuka.tolist()):
+            lines.append("株" + str(i + 1) + "は" + str(kabuka))
+        for i, motika in enumerate(portfolio.motika.tolist()):
+            lines.append("持ち株" + str(i + 1) + "は" + str(motika))
+        lines.append("残金は" + str(portfolio.kane))
+        if self.skipped:
+            lines.append("(ほかに売買" + str(self.skipped) + "件)")
+            self.skipped = 0
+        self.out.write("\n".join(lines) + "\n")
+
+    def trade(self, portfolio, i, side, qty, price):
+        now = time.monotonic()
+        if self.window is None or now - self.window >= self.interval:
+            self.window = now
+            self.trades = 0
+        if self.trades >= self.maxtrades:
+            self.skipped += 1
+            return
+        self.trades += 1
+        kind = "購入" if side == KAU else "売却"
+        self.out.write("株" + str(i + 1) + "を" + str(qty) + "株" + kind + "しました\n")
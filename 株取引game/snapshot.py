@@ -0,0 +1,155 @@
+import os
+import struct
+import threading
+import zlib
+from array import array
+
+import numpy as np
+
+from market import Market, Portfolio, PriceEngine
+
+## ゲームの状態をまるごと保存するバイナリファイル
+## 落ちても最後に保存したところから続けられるように、乱数の状態まで全部入れる。
+##  ヘッダ(little endian)
+##   magic "KBSNAP", version u16, tick i64, q i64, kane i64, 銘柄数 u32,
+##   乱数のversion u32, gaussがあるか u8, gauss f64
+##  本体
+##   乱数の状態 u32 x 625
+##   株価 i64 x n, 割る数 f64 x n, 戻り値 i64 x n, 倒産回数 i64 x n, 持ち株 i64 x n
+##  最後にそれまで全部のcrc32 u32
+## 書くときは一時ファイルに書いてfsyncしてからos.replace()するので、
+## ファイルはいつも古いものか新しいもののどちらかが丸ごと残る。
+
+MAGIC = b"KBSNAP"
+VERSION = 1
+HEADER = struct.Struct("<6sHqqqIIBd")
+CRC = struct.Struct("<I")
+MTSIZE = 625
+
+
+## 市場と口座をbytesにする(市場を動かしているスレッドで呼ぶ)
+def dumps(market, portfolio):
+    e = market.engine
+    rng_version, state, gauss = market.rng.getstate()
+    if len(state) != MTSIZE:
+        raise ValueError("乱数の状態の長さが違います")
+    head = HEADER.pack(MAGIC, VERSION, market.tick, market.q, portfolio.kane, len(e),
+                       rng_version, gauss is not None, 0.0 if gauss is None else gauss)
+    body = b"".join((
+        np.array(state, dtype="<u4").tobytes(),
+        e.kabuka.astype("<i8").tobytes(),
+        e.waru.astype("<f8").tobytes(),
+        e.reset.astype("<i8").tobytes(),
+        e.resets.astype("<i8").tobytes(),
+        np.asarray(portfolio.motika, dtype="<i8").tobytes(),
+    ))
+    data = head + body
+    return data + CRC.pack(zlib.crc32(data))
+
+## dumps()のbytesから市場と口座を作り直す。口座のsinkはNone
+def loads(data):
+    data = memoryview(data)
+    if len(data) < HEADER.size + CRC.size:
+        raise ValueError("スナップショットが短すぎます")
+    (crc,) = CRC.unpack_from(data, len(data) - CRC.size)
+    if zlib.crc32(data[:-CRC.size]) != crc:
+        raise ValueError("スナップショットが壊れています")
+    magic, version, tick, q, kane, n, rng_version, has_gauss, gauss = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("スナップショットのファイルではありません")
+    if version != VERSION:
+        raise ValueError("知らないバージョンです: " + str(version))
+    if len(data) != HEADER.size + 4 * MTSIZE + 5 * 8 * n + CRC.size:
+        raise ValueError("スナップショットの長さが合いません")
+    pos = HEADER.size
+    state = tuple(np.frombuffer(data, dtype="<u4", count=MTSIZE, offset=pos).tolist())
+    pos += 4 * MTSIZE
+    cols = []
+    for dtype in ("<i8", "<f8", "<i8", "<i8", "<i8"):
+        cols.append(np.frombuffer(data, dtype=dtype, count=n, offset=pos))
+        pos += 8 * n
+    kabuka, waru, reset, resets, motika = cols
+
+    engine = PriceEngine(kabuka, waru, reset)
+    engine.resets[:] = resets
+    market = Market(engine=engine)
+    market.rng.setstate((rng_version, state, gauss if has_gauss else None))
+    market.q = q
+    market.tick = tick
+    portfolio = Portfolio(market, kane=kane)
+    portfolio.motika = array("q", motika.tolist())
+    return market, portfolio
+
+## bytesをpathへ書く。一時ファイル → fsync → os.replace() の順なので途中で落ちても壊れない
+def write(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    # 名前の付け替えもディスクに残す(できるOSだけ)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def save(path, market, portfolio):
+    write(path, dumps(market, portfolio))
+
+def load(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+## MarketWorkerの市場と口座をinterval秒ごとに保存するスレッド
+## 状態をbytesにするところだけworker.call()で市場のスレッドにやらせ、
+## ファイルへの書き込みはこのスレッドで行うので、市場も画面も止まらない。
+class Snapshotter(threading.Thread):
+
+    def __init__(self, worker, path, interval=10.0):
+        super().__init__(name="Snapshotter", daemon=True)
+        self.worker = worker
+        self.path = path
+        self.interval = interval
+        self.saved = 0  # 保存した回数
+        self.__last = None
+        self.__stop = threading.Event()
+
+    ## 今の状態をすぐに保存する。市場のスレッドがtimeout秒以内に応えなければFalse
+    def save(self, timeout=None):
+        box = []
+        done = threading.Event()
+        def capture():
+            box.append(dumps(self.worker.market, self.worker.portfolio))
+            done.set()
+        self.worker.call(capture)
+        if not done.wait(timeout):
+            return False
+        data = box[0]
+        # 一時停止中などで何も変わっていなければ書かない
+        if data != self.__last:
+            write(self.path, data)
+            self.saved += 1
+            self.__last = data
+        return True
+
+    def stop(self, timeout=None):
+        self.__stop.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        while not self.__stop.wait(self.interval):
+            if not self.worker.is_alive():
+                break
+            try:
+                self.save(self.interval)
+            except OSError as e:
+                print("保存できませんでした: " + str(e))
@@ -1,12 +1,29 @@
+import os
+import sys
+import time
 import tkinter
-import tkinter.font as font
 import tkinter.ttk as ttk
-from inspect import signature
-import re
-from tkinter import filedialog
-from tkinter import simpledialog
-from tkinter import messagebox
-import platform
+import weakref
+from array import array
+from collections import deque
+
+from scheduler import Job, Scheduler
+
+## 読み込みを速くするため、ダイアログ・フォント・inspect・re・platformは
+## 最初に使うときに読み込む(Fontクラスとfiledialogなどは下の__getattr__)
+## Fontは from tentoapp import * では読み込まれないので、使うときは
+## from tentoapp import Font または tentoapp.Font とする。
+
+__all__ = [
+    "ClassProperty", "PropertyMeta", "MixinState", "StyleRegistry", "styleregistry",
+    "RadioGroupRegistry", "radiogroups",
+    "AbstractStateTtk", "AbstractConfig", "MixinLayout",
+    "Window", "App", "Job", "Scheduler", "LayoutBatch", "Profiler", "CallbackStats",
+    "Frame", "XBox", "YBox", "RelativeBox", "Image",
+    "Button", "Label", "CheckButton", "RadioButton", "Entry", "ComboBox",
+    "ListBox", "VirtualListBox", "ScrollBar", "Text", "TextBox", "Console", "Spinbox",
+    "Dialog", "Canvas", "CanvasObject", "ChartSeries", "Chart", "Sound",
+]
 
 ## History
 # 2018.10.11 add CheckButton
@@ -25,17 +42,22 @@ class PropertyMeta(type):
         for k, v in props:
             setattr(cls, k, v)
             del namespace[k]
-        return type.__new__(cls, name, bases, namespace)
+        newcls = type.__new__(cls, name, bases, namespace)
+        # AbstractConfigの属性アクセスで毎回タプルを探さないように、クラスを作るときに1回だけ集合にしておく
+        newcls._propset = frozenset(getattr(newcls, "props", ()))
+        return newcls
 
 ## 継承専用クラス
 ## self.state()で設定するものをプロパティ化するための
+## disabledはクリックのたびに読むので、Tclに聞くのは最初の1回だけにしてself._disabledに覚えておく
+## (self["state"]やconfigure()で直接変えたときは、AbstractConfigのconfigure()が合わせる)
 class MixinState():
     @property
     def disabled(self):
-        if self["state"] == tkinter.DISABLED:
-            return true
-        else:
-            return false
+        disabled = self.__dict__.get("_disabled")
+        if disabled is None:
+            disabled = self._disabled = (self["state"] == tkinter.DISABLED)
+        return disabled
 
     @disabled.setter
     def disabled(self,arg):
@@ -43,6 +65,123 @@ class MixinState():
             self["state"] = tkinter.DISABLED
         else:
             self["state"] = tkinter.NORMAL
+        self._disabled = (arg == True)
+
+
+## ttkのstyleの登録所
+## (クラス名, fontsize, bgcolor, color)の組ごとにstyleを1つだけ作って共有する。
+## どのwidgetも使わなくなったstyleは名前を取っておき、次に別の組で使い回す。
+## styleはTkのインタプリタごとにあるので、rootごとに1つ作る(styleregistry())。
+class StyleRegistry():
+    def __init__(self, master=None):
+        self.master = master
+        self.__style = None
+        self.__names = {}  # 組 -> style名
+        self.__keys = {}   # style名 -> 組
+        self.__refs = {}   # style名 -> 使っているwidgetの数
+        self.__free = {}   # クラス名 -> 使われていないstyle名のリスト
+        self.__count = 0
+
+    ## ttk.Style()は1つだけ作って使い回す
+    @property
+    def style(self):
+        if self.__style is None:
+            self.__style = ttk.Style(self.master)
+        return self.__style
+
+    def __len__(self):
+        return len(self.__names)
+
+    def acquire(self, classname, fontsize=None, bgcolor=None, color=None):
+        key = (classname, fontsize, bgcolor, color)
+        name = self.__names.get(key)
+        if name is None:
+            base = "T" + classname
+            opts = {}
+            free = self.__free.get(classname)
+            if free:
+                name = free.pop()
+                # 使い回したstyleに前の設定が残らないように、指定のないものは元のクラスの値に戻す
+                opts["font"] = self.style.lookup(base,"font")
+                opts["background"] = self.style.lookup(base,"background")
+                opts["foreground"] = self.style.lookup(base,"foreground")
+            else:
+                self.__count += 1
+                name = "s" + str(self.__count) + "." + base
+            if fontsize is not None:
+                opts["font"] = ("",fontsize)
+            if bgcolor is not None:
+                opts["background"] = bgcolor
+            if color is not None:
+                opts["foreground"] = color
+            if opts:
+                self.style.configure(name, **opts)
+            self.__names[key] = name
+            self.__keys[name] = key
+            self.__refs[name] = 0
+        self.__refs[name] += 1
+        return name
+
+    def release(self, name):
+        if name not in self.__refs:
+            return
+        self.__refs[name] -= 1
+        if self.__refs[name] == 0:
+            key = self.__keys.pop(name)
+            del self.__names[key]
+            del self.__refs[name]
+            self.__free.setdefault(key[0], []).append(name)
+
+## widgetのrootのStyleRegistry(最初に使ったときに作り、rootと一緒に消える)
+def styleregistry(widget):
+    root = widget._root()
+    registry = root.__dict__.get("_styleregistry")
+    if registry is None:
+        registry = root._styleregistry = StyleRegistry(root)
+    return registry
+
+
+## RadioButtonのグループの登録所
+## グループ名ごとに、共有するStringVarと、そのグループのRadioButtonを弱参照で持つ。
+## RadioButtonがdestroyされたり消えたりすると、グループから自然に抜ける。
+class RadioGroupRegistry():
+    def __init__(self):
+        self.__groups = {}  # グループ名 -> [StringVar, WeakSet]
+
+    ## RadioButtonが1つ以上いるグループの数
+    def __len__(self):
+        return sum(1 for group in self.__groups.values() if len(group[1]) > 0)
+
+    def __contains__(self, name):
+        members = self.__groups.get(name)
+        return members is not None and len(members[1]) > 0
+
+    ## radioをグループnameに入れて、共有するStringVarを返す
+    def join(self, name, radio):
+        group = self.__groups.get(name)
+        if group is None or len(group[1]) == 0:
+            # 誰もいないグループは新しい変数で作り直す
+            group = self.__groups[name] = [tkinter.StringVar(), weakref.WeakSet()]
+        group[1].add(radio)
+        return group[0]
+
+    def leave(self, name, radio):
+        group = self.__groups.get(name)
+        if group is None:
+            return
+        group[1].discard(radio)
+        if len(group[1]) == 0:
+            del self.__groups[name]
+
+    def variable(self, name):
+        group = self.__groups.get(name)
+        return None if group is None else group[0]
+
+    def members(self, name):
+        group = self.__groups.get(name)
+        return [] if group is None else list(group[1])
+
+radiogroups = RadioGroupRegistry()
 
 
 ## 継承専用クラス
@@ -50,27 +189,31 @@ class MixinState():
 ## ttk.の新しいクラス用
 ## 11.10 constructorをなくしてMixin化したい。
 class AbstractStateTtk(metaclass=PropertyMeta):
+    # CheckButtonやRadioButtonは__init__を呼ばないので、クラスの値を初期値にしておく
+    __stylename = None  # 今使っているstyleの名前(Noneなら"T"+クラス名)
+    __styleattrs = None # fontsize, bgcolor, color
+
     def __init__(self):
         pass
 #        self.__disabled = False
 #        self.__readonly = False
 
+    ## MixinStateと同じく、instate()を呼ぶのは最初の1回だけ
+    ## (state()を直接呼んで変えたときは self._disabled = None で読み直す)
     @property
     def disabled(self):
-#        return self.__disabled
-        if self.instate(["disabled"]):
-            return True
-        else:
-            return False
+        disabled = self.__dict__.get("_disabled")
+        if disabled is None:
+            disabled = self._disabled = bool(self.instate(["disabled"]))
+        return disabled
 
     @disabled.setter
     def disabled(self,arg):
         if arg == True:
             self.state(["disabled"])
-            #self.__disabled = True
         else:
             self.state(["!disabled"])
-            #self.__disabled = False
+        self._disabled = (arg == True)
 
     @property
     def readonly(self):
@@ -90,51 +233,71 @@ class AbstractStateTtk(metaclass=PropertyMeta):
 
     @property
     def fontsize(self):
-        return self.__fontsize
+        return self.__styleattr("fontsize")
 
     @fontsize.setter
     def fontsize(self,size):
-        style_name = self.stylename()
-        self.style = style_name
-        ttk.Style().configure(style_name,font=("",size))
-        self.__fontsize = size
+        self.__restyle("fontsize", size)
         ## ttk.Entryがなぜかstyleを受け付けないので。。
         if self.__class__.__name__ in ("Entry", "Spinbox"):
             self.font = ("", size)
 
     @property
     def bgcolor(self):
-        style_name = self.stylename()
-        self.style = style_name
-        return ttk.Style().lookup(style_name,"background")
+        arg = self.__styleattr("bgcolor")
+        if arg is None:
+            return styleregistry(self).style.lookup(self.stylename(),"background")
+        return arg
 
     @bgcolor.setter
     def bgcolor(self,arg):
-        style_name = self.stylename()
-        self.style = style_name
-        ttk.Style().configure(style_name,background=arg)
-        #print(ttk.Style().lookup(style_name,"background"))
-        self.__bgcolor = arg
-        
+        self.__restyle("bgcolor", arg)
+
+    ## 今使っているstyleの名前
     def stylename(self):
-        return str(id(self)) + ".T" + self.__class__.__name__  ## ここなんとかしたい
+        if self.__stylename is None:
+            return "T" + self.__class__.__name__
+        return self.__stylename
 
     @property
     def color(self):
-        style_name = self.stylename()
-        self.style = style_name
-        return ttk.Style().lookup(style_name,"foreground")
-       
+        arg = self.__styleattr("color")
+        if arg is None:
+            return styleregistry(self).style.lookup(self.stylename(),"foreground")
+        return arg
+
     @color.setter
     def color(self,arg):
-        style_name = self.stylename()
-        self.style = style_name
-        ttk.Style().configure(style_name ,foreground=arg)
+        self.__restyle("color", arg)
 
+    def __styleattr(self, name):
+        if self.__styleattrs is None:
+            return None
+        return self.__styleattrs[name]
+
+    ## fontsize, bgcolor, colorの組が同じwidgetは同じstyleを共有する
+    def __restyle(self, name, arg):
+        if self.__styleattrs is None:
+            self.__styleattrs = {"fontsize": None, "bgcolor": None, "color": None}
+            self.bind("<Destroy>", self.__release_style, add="+")
+        self.__styleattrs[name] = arg
+        a = self.__styleattrs
+        old = self.__stylename
+        registry = styleregistry(self)
+        self.__stylename = registry.acquire(self.__class__.__name__, a["fontsize"], a["bgcolor"], a["color"])
+        self.style = self.__stylename
+        if old is not None:
+            registry.release(old)
+
+    def __release_style(self, e):
+        if e.widget is self and self.__stylename is not None:
+            styleregistry(self).release(self.__stylename)
+            self.__stylename = None
 
     @ClassProperty
     def allfontsize(cls):
         cname = "T" + cls.__name__  ## ここなんとかしたい
+        import re
         font = ttk.Style().lookup(cname,"font")
         m = re.search(r"[0-9]+", font)
         if m != None:
@@ -149,65 +312,178 @@ class AbstractStateTtk(metaclass=PropertyMeta):
 
     
 
+## 同じ値ならTclを呼ばずに済ませてよい型(その場で中身が変わらないもの)
+_IMMUTABLE = frozenset((str, int, float, bool, type(None), tuple))
+
 ## 継承専用クラス
 ## self.configure()で設定するものをプロパティ化するための
-class AbstractConfig():
+class AbstractConfig(metaclass=PropertyMeta):
     def __init__(self):
         self.__property = {}
 
     def __getattr__(self,name):
-        cls = globals()[self.__class__.__name__]
 #        self.__propcheck()
-        if name in cls.props:
+        if name in type(self)._propset:
             #= setする前のgetに対応
             if name not in self.__property:
                 self.__property[name] = None
             return self.__property[name]
 
     def __setattr__(self,name,value):
-        cls = globals()[self.__class__.__name__]
-        if name in cls.props:
+        if name in type(self)._propset:
 #            self.__propcheck()
+            #== 値が変わっていなければTclを呼ばない
+            #== (listなどはその場で中身を変えられるので、変わらない型のときだけ比べる)
+            if name in self.__property and type(value) in _IMMUTABLE:
+                old = self.__property[name]
+                if type(old) is type(value) and old == value:
+                    return
             self.__property[name] = value
-            dic = {}
-            dic[name] = value
-            self.configure(**dic)
+            if name == "state":
+                # MixinState.disabledが覚えている値も合わせる
+                self.__dict__["_disabled"] = (value == tkinter.DISABLED)
+            root = self._root() if isinstance(self, tkinter.Misc) else None
+            if isinstance(root, Window) and root.coalesce:
+                root.defer(self, name, value)
+            else:
+                dic = {}
+                dic[name] = value
+                self.configure(**dic)
         else:
             #== ここはRaiseErrorしたほうがよくないか？？
             super().__setattr__(name,value)
 
+    ## configure()やself[name] = value(これもconfigure()を呼ぶ)で直接変えたときも、覚えている値を合わせる
+    ## (覚えている値が古いままだと、次に同じ値をsetしたときに変わっていないとみなして省いてしまう)
+    ## AbstractConfigはMROでtkinterのクラスより後ろにあるので、サブクラスごとにconfigureを差し込む
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.configure = cls.config = AbstractConfig.__configure
+
+    def __configure(self, cnf=None, **kw):
+        prop = self.__dict__.get("_AbstractConfig__property")
+        if prop is not None and (kw or isinstance(cnf, dict)):
+            opts = dict(cnf) if isinstance(cnf, dict) else {}
+            opts.update(kw)
+            propset = type(self)._propset
+            root = self._root()
+            for name, value in opts.items():
+                # tkinterは最後の_を取るので、self["from"]はプロパティのfrom_
+                if name not in propset and name + "_" in propset:
+                    name = name + "_"
+                if name not in propset:
+                    continue
+                if type(value) in _IMMUTABLE:
+                    prop[name] = value
+                else:
+                    prop.pop(name, None)
+                if name == "state":
+                    # MixinState.disabledが覚えている値も合わせる(文字列でなければTclに聞き直す)
+                    self.__dict__["_disabled"] = (value == tkinter.DISABLED) if type(value) is str else None
+                if isinstance(root, Window):
+                    # まだ反映していない古い値が、あとからこの値を上書きしないようにする
+                    root.undefer(self, name)
+        return tkinter.Misc.configure(self, cnf, **kw)
+
 #    def __propcheck(self):
 #        if self.__property == None:
 #            self.__property = {}
 
+## onclickの関数がeventを受け取るかどうか
+## inspect.signature()は遅いので、関数のコードごとに1回だけ調べて覚えておく
+## (同じ場所で作ったlambdaはコードが同じなので、lambda:ko(0)とlambda:ko(1)は1回で済む)
+## ただしfunctools.wraps()で包んだ関数(__wrapped__)や__signature__のある関数は、
+## signature()が包まれた側を見るので、同じコードでも答えが違う。*args/**kwargsのものも覚えない
+## 関数を作り続けるプログラムでも増え続けないように、TAKES_EVENT_MAXを超えたら忘れる
+TAKES_EVENT_MAX = 1024
+_takes_event = {}
+## inspect.CO_VARARGS | inspect.CO_VARKEYWORDS(inspectは重いので起動時には読まない)
+_VARARGS = 0x04 | 0x08
+
+def _takesevent(func):
+    code = getattr(func, "__code__", None)
+    if (code is None or code.co_flags & _VARARGS
+            or hasattr(func, "__wrapped__") or hasattr(func, "__signature__")):
+        from inspect import signature
+        return len(signature(func).parameters) != 0
+    key = (code, hasattr(func, "__self__"))
+    takes = _takes_event.get(key)
+    if takes is None:
+        from inspect import signature
+        if len(_takes_event) >= TAKES_EVENT_MAX:
+            _takes_event.clear()
+        takes = _takes_event[key] = len(signature(func).parameters) != 0
+    return takes
+
+
+## Tkが返すのと同じ順(n, e, s, w)にそろえる
+def _sticky(arg):
+    arg = str(arg).lower()
+    return "".join(c for c in "nesw" if c in arg)
+
+## layoutのTclコマンドを1つ実行する。Window.batch_layout()の中ならためておく
+def _layout_run(widget, cmd):
+    root = widget._root()
+    batch = root.__dict__.get("_batch") if isinstance(root, Window) else None
+    if batch is not None:
+        batch.commands.append(cmd)
+    else:
+        widget.tk.call(*cmd)
+
+
 ## 継承専用クラス
 ## Layout関連をまとめるためのクラス
+## grid()などで設定した値はPython側にも覚えておき、sticky/colspan/rowspanを読むときにTclへ聞かない。
+## (tkinterのgrid_configure()などを直接呼んだときは self._layout = None で読み直す)
+## Window.batch_layout()の中では、Tclへのコマンドをためておき最後に1回でまとめて実行する。
 class MixinLayout():
     def pack(self):
         master_class = self.master.__class__.__name__
         if master_class == "XBox":
-            super().pack(anchor=tkinter.N+tkinter.W,side="left")
+            self.__layout_cmd("pack", anchor=tkinter.N+tkinter.W,side="left")
         elif master_class == "YBox":
-            super().pack(anchor=tkinter.N+tkinter.W,side="top")
+            self.__layout_cmd("pack", anchor=tkinter.N+tkinter.W,side="top")
         else:
-            super().pack(anchor=tkinter.N+tkinter.W,side="top")
+            self.__layout_cmd("pack", anchor=tkinter.N+tkinter.W,side="top")
             #super().pack(anchor=tkinter.N+tkinter.W,fill=tkinter.BOTH)
 
     def place(self,*arg):
         if len(arg) == 2:
-            super().place(x=arg[0],y=arg[1])
+            self.__layout_cmd("place", x=arg[0],y=arg[1])
         elif len(arg) == 4:
-            super().place(x=arg[0],y=arg[1],width=arg[2],height=arg[3])
+            self.__layout_cmd("place", x=arg[0],y=arg[1],width=arg[2],height=arg[3])
 
     def grid(self,x,y):
         # set defalt alignment to North+West
-        super().grid(column=x,row=y,sticky=tkinter.N+tkinter.W)
+        self.__layout_cmd("grid", column=x,row=y,sticky=tkinter.N+tkinter.W)
+
+    ## manager("pack", "place", "grid")の設定をする。Python側の記録も合わせる
+    def __layout_cmd(self, manager, **options):
+        layout = self.__dict__.get("_layout")
+        if layout is None or layout[0] != manager:
+            # 別のmanagerに移るときは、前の設定はもう使わない
+            layout = self._layout = (manager, {"columnspan": 1, "rowspan": 1} if manager == "grid" else {})
+        if "sticky" in options:
+            options["sticky"] = _sticky(options["sticky"])
+        layout[1].update(options)
+        args = [manager, "configure", self._w]
+        for k, v in options.items():
+            args.append("-" + k)
+            args.append(v)
+        _layout_run(self, tuple(args))
 
     def __get_grid_info__(self, name):
-        tcl_obj = self.tk.call("grid","info",self._w)
-        li = str(tcl_obj).split()
-        dic = dict(zip(li[0::2], li[1::2]))
-        return dic["-" + name]
+        layout = self.__dict__.get("_layout")
+        if layout is None or layout[0] != "grid" or name not in layout[1]:
+            # Python側で知らないときだけTclに聞く
+            info = self.tk.splitlist(self.tk.call("grid","info",self._w))
+            dic = dict(zip((k[1:] for k in info[0::2]), info[1::2]))
+            if not dic:
+                raise KeyError("-" + name)
+            if "sticky" in dic:
+                dic["sticky"] = _sticky(str(dic["sticky"]))
+            layout = self._layout = ("grid", dic)
+        return layout[1][name]
 
 
     @property
@@ -216,7 +492,7 @@ class MixinLayout():
 
     @sticky.setter
     def sticky(self,arg):
-        self.grid_configure(sticky=arg)
+        self.__layout_cmd("grid", sticky=arg)
         
 
     @property
@@ -225,7 +501,7 @@ class MixinLayout():
 
     @colspan.setter
     def colspan(self,num):
-        self.grid_configure(columnspan=num)
+        self.__layout_cmd("grid", columnspan=num)
 
     @property
     def rowspan(self):
@@ -233,16 +509,17 @@ class MixinLayout():
 
     @rowspan.setter
     def rowspan(self,num):
-        self.grid_configure(rowspan=num)
+        self.__layout_cmd("grid", rowspan=num)
 
 
     def remove(self):
         self.hide()
 
     def hide(self):
-        self.place_forget()
-        self.pack_forget()
-        self.grid_forget()
+        self._layout = None
+        _layout_run(self, ("place", "forget", self._w))
+        _layout_run(self, ("pack", "forget", self._w))
+        _layout_run(self, ("grid", "forget", self._w))
 
     @property
     def onclick(self):
@@ -254,13 +531,13 @@ class MixinLayout():
 
     @onclick.setter
     def onclick(self,func):
-        sig = signature(func)
-        newfunc = None
-        if (len(sig.parameters) == 0):
-            newfunc = (lambda e:None if e.widget.disabled else func())
+        if _takesevent(func):
+            newfunc = (lambda e:None if self.disabled else func(e))
+            self.bind("<Button-1>",newfunc)
         else:
-            newfunc = (lambda e:None if e.widget.disabled else func(e))
-        self.bind("<Button-1>",newfunc)
+            newfunc = (lambda e=None:None if self.disabled else func())
+            # eventを使わないので、bind()のように毎回%の置き換えをしてEventを作るコマンドにはしない
+            self.tk.call("bind", self._w, "<Button-1>", self._register(newfunc))
         self.__onclick = newfunc
         #if self.__class__.__name__ == "Button":
         #    self.command = func
@@ -272,6 +549,20 @@ class MixinLayout():
         #    self.bind("<Button-1>",newfunc)
         #    self.__onclick = newfunc
 
+    ## Tkを通さずにonclickの関数を呼ぶ(スクリプトやテスト用)。disabledなら何もしない
+    ## eventを省くと、このwidgetの左クリックとしてEventを作って渡す
+    def click(self, event=None):
+        newfunc = self.__onclick
+        if newfunc is None:
+            return None
+        if event is None:
+            event = tkinter.Event()
+            event.widget = self
+            event.type = tkinter.EventType.ButtonPress
+            event.num = 1
+            event.x = event.y = 0
+        return newfunc(event)
+
     @property
     def onkeypress(self):
         return self.__onkeypress
@@ -285,13 +576,78 @@ class MixinLayout():
 # Base for All
 class Window(tkinter.Tk):
 
-    def __init__(self,**args):
+    ## profile=True(または環境変数TENTOAPP_PROFILE=1)にすると、after()・after_idle()・
+    ## bind()・onclickのコールバックにかかった時間をself.profilerに集める
+    ## (有効にする前に登録されたコールバックは測らないので、widgetを作る前に有効にする)
+    def __init__(self,profile=None,**args):
         super().__init__(**args)
         self.title("tentoapp")
+        # Trueにすると、プロパティの変更をためておき1フレームに1回まとめて反映する
+        self.coalesce = False
+        self.__pending = {}
+        self.__scheduler = None
+        self.__profiler = None
+        self._batch = None  # batch_layout()の中ならLayoutBatch
+        if profile is None:
+            profile = os.environ.get("TENTOAPP_PROFILE", "") not in ("", "0")
+        if profile:
+            self.profiler.enable()
+
+    ## widgetのconfigure()をためておく(after_idleでflush()される)
+    def defer(self, widget, name, value):
+        if not self.__pending:
+            self.after_idle(self.flush)
+        pending = self.__pending.get(widget)
+        if pending is None:
+            pending = self.__pending[widget] = {}
+        pending[name] = value
+
+    ## widgetのnameについてためておいたconfigure()を取り消す
+    def undefer(self, widget, name):
+        pending = self.__pending.get(widget)
+        if pending is not None:
+            pending.pop(name, None)
+
+    ## ためておいたconfigure()をwidgetごとに1回ずつ反映する
+    def flush(self):
+        pending = self.__pending
+        self.__pending = {}
+        for widget, dic in pending.items():
+            try:
+                widget.configure(**dic)
+            except tkinter.TclError:
+                pass  # flushまでにdestroyされたwidget
+
+    ## この中でのpack()/grid()/place()/hide()とsticky/colspan/rowspanの変更は、
+    ## ためておいて最後にTclを1回呼ぶだけでまとめて反映する
+    ##   with app.batch_layout():
+    ##       for i, cell in enumerate(cells):
+    ##           cell.grid(i % 10, i // 10)
+    def batch_layout(self):
+        return LayoutBatch(self)
+
+    ## 一定間隔で呼ぶ処理を登録するためのScheduler(最初に使ったときに作る)
+    @property
+    def scheduler(self):
+        if self.__scheduler is None:
+            self.__scheduler = Scheduler(self)
+        return self.__scheduler
+
+    ## コールバックの時間を測るProfiler(最初に使ったときに作る。enable()するまでは何もしない)
+    @property
+    def profiler(self):
+        if self.__profiler is None:
+            self.__profiler = Profiler(self)
+        return self.__profiler
 
     def start(self):
         super().mainloop()
 
+    def destroy(self):
+        if self.__profiler is not None:
+            self.__profiler.disable()
+        super().destroy()
+
     def size(self, width, height):
         self.__width = width
         self.__height = height
@@ -344,6 +700,176 @@ class Window(tkinter.Tk):
 
 
 
+#== LayoutBatch
+## ためたコマンドを順に実行するTclのスクリプト。失敗したものは飛ばして、エラーをまとめて返す
+_BATCH_SCRIPT = """{cmds} {
+    set errors {}
+    foreach cmd $cmds {
+        if {[catch {{*}$cmd} err]} { lappend errors $err }
+    }
+    return $errors
+}"""
+
+class LayoutBatch():
+
+    def __init__(self, window):
+        self.window = window
+        self.commands = []
+        self.__outer = None
+
+    def __enter__(self):
+        # 入れ子にしたときは一番外側でまとめて実行する
+        self.__outer = self.window.__dict__.get("_batch")
+        if self.__outer is None:
+            self.window._batch = self
+        return self
+
+    def __exit__(self, *exc):
+        if self.__outer is not None:
+            return False
+        self.window._batch = None
+        self.flush()
+        return False
+
+    def flush(self):
+        cmds = self.commands
+        self.commands = []
+        if not cmds:
+            return
+        errors = self.window.tk.splitlist(self.window.tk.call("apply", _BATCH_SCRIPT, tuple(cmds)))
+        # 実行するまでにdestroyされたwidgetのものは気にしない(Window.flushと同じ)
+        errors = [e for e in errors if not str(e).startswith("bad window path name")]
+        if errors:
+            raise tkinter.TclError(str(errors[0]))
+
+
+#== Profiler
+## tkinterはafter()・bind()・commandなどのPython側のコールバックを全部CallWrapperで包んで呼ぶ。
+## 有効にしている間だけCallWrapperを時間を測るものに差し替えるので、無効のときは何も変わらない。
+## 時間は2倍ごとの区切り(1us, 2us, 4us, ...)のヒストグラムにためる。
+
+class _TimedCallWrapper(tkinter.CallWrapper):
+    profiler = None
+
+    def __init__(self, func, subst, widget):
+        super().__init__(func, subst, widget)
+        name = getattr(func, "__name__", None) or type(func).__name__
+        if name == "<lambda>":
+            # lambdaだけではどれかわからないので、どのwidgetのものかをつける
+            name = "<lambda> " + str(widget)
+        self.name = name
+
+    def __call__(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().__call__(*args)
+        finally:
+            profiler = _TimedCallWrapper.profiler
+            if profiler is not None:
+                profiler.record(self.name, time.perf_counter() - start)
+
+
+class CallbackStats():
+    __slots__ = ("name", "calls", "total", "max", "slow", "buckets")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.buckets = [0] * 32  # buckets[k]は2**(k-1)us以上2**k us未満
+
+    ## p%の呼び出しがこれ以下で終わった時間(ミリ秒, 区切りの上端)
+    def percentile(self, p):
+        if self.calls == 0:
+            return 0.0
+        need = p / 100 * self.calls
+        seen = 0
+        for k, count in enumerate(self.buckets):
+            seen += count
+            if seen >= need:
+                return min((1 << k) / 1000, self.max * 1000)
+        return self.max * 1000
+
+    def report(self):
+        return {"name": self.name, "calls": self.calls, "total_ms": self.total * 1000,
+                "mean_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+                "p50_ms": self.percentile(50), "p90_ms": self.percentile(90),
+                "p99_ms": self.percentile(99), "max_ms": self.max * 1000, "slow": self.slow}
+
+
+class Profiler():
+
+    def __init__(self, window, slow=0.016):
+        self.window = window
+        self.slow = slow  # これより長くかかったコールバックは警告する(秒, 1フレーム)
+        self.stats = {}
+        self.recent = deque(maxlen=100)  # 最近の遅いコールバック(時刻, 名前, 秒)
+        self.out = sys.stderr
+        self.__job = None
+
+    @property
+    def enabled(self):
+        return _TimedCallWrapper.profiler is self
+
+    def enable(self):
+        if _TimedCallWrapper.profiler is not None and _TimedCallWrapper.profiler is not self:
+            raise RuntimeError("ほかのWindowのProfilerが有効です")
+        _TimedCallWrapper.profiler = self
+        tkinter.CallWrapper = _TimedCallWrapper
+
+    def disable(self):
+        if _TimedCallWrapper.profiler is self:
+            _TimedCallWrapper.profiler = None
+            tkinter.CallWrapper = _TimedCallWrapper.__bases__[0]
+        if self.__job is not None:
+            self.__job.cancel()
+            self.__job = None
+
+    def record(self, name, elapsed):
+        st = self.stats.get(name)
+        if st is None:
+            st = self.stats[name] = CallbackStats(name)
+        st.calls += 1
+        st.total += elapsed
+        if elapsed > st.max:
+            st.max = elapsed
+        st.buckets[min(31, int(elapsed * 1e6).bit_length())] += 1
+        if elapsed >= self.slow:
+            st.slow += 1
+            self.recent.append((time.time(), name, elapsed))
+            print("遅いコールバック: %s %.1fms" % (name, elapsed * 1000), file=self.out)
+
+    def reset(self):
+        self.stats = {}
+        self.recent.clear()
+
+    ## コールバックごとの集計を、かかった時間の合計が多い順に返す
+    def report(self):
+        stats = sorted(self.stats.values(), key=lambda st: st.total, reverse=True)
+        return [st.report() for st in stats]
+
+    def dump(self, top=10):
+        print("%-32s %8s %10s %8s %8s %8s %8s %5s" % (
+            "callback", "calls", "total ms", "mean", "p50", "p99", "max", "slow"), file=self.out)
+        for r in self.report()[:top]:
+            print("%-32s %8d %10.1f %8.2f %8.2f %8.2f %8.2f %5d" % (
+                r["name"][:32], r["calls"], r["total_ms"], r["mean_ms"], r["p50_ms"],
+                r["p99_ms"], r["max_ms"], r["slow"]), file=self.out)
+
+    ## seconds秒ごとにdump()する。seconds=Noneで止める
+    def every(self, seconds, top=10):
+        if self.__job is not None:
+            self.__job.cancel()
+            self.__job = None
+        if seconds is not None:
+            dump = lambda: self.dump(top)
+            dump.__name__ = "Profiler.dump"
+            self.__job = self.window.scheduler.every(seconds * 1000, dump)
+        return self.__job
+
+
 # Alias for Window
 class App(Window):
     pass
@@ -390,13 +916,6 @@ class Image(tkinter.PhotoImage):
         super().__init__(file=file)
 
 
-class Font(font.Font, AbstractConfig):
-    props = ("family", "size", "weight","slant", "underline","overstrike")
-    def __init__(self,*parent,**args):
-        ttk.Frame.__init__(self,*parent,**args)
-        AbstractConfig.__init__(self)
-
-
 class Button(MixinLayout,ttk.Button, AbstractStateTtk,AbstractConfig):
     props = ("text", "image", "command", "compound","cursor","style","takefocus","textvariable","underline","width")
 
@@ -445,28 +964,32 @@ class CheckButton(MixinLayout,ttk.Checkbutton, AbstractStateTtk,AbstractConfig):
 class RadioButton(MixinLayout,ttk.Radiobutton,AbstractStateTtk, AbstractConfig):
     props = ("command", "compound", "cursor",  "offvalue", "onvalue", "style", "takefocus", "variable", "value","underline", "width")
 
-    instances = []
+    count = 0  # これまでに作った数
 
     def __init__(self,*parent,**args):
         ttk.Radiobutton.__init__(self,*parent,**args)
         AbstractConfig.__init__(self)
-        RadioButton.instances.append(self)
-        self.number = len(RadioButton.instances)
-        self.groupname = ""
+        RadioButton.count += 1
+        self.number = RadioButton.count
+        self.groupname = None
+        self.bind("<Destroy>", self.__leave, add="+")
         self.group = ""
 
     @property
     def group(self):
         return self.groupname
 
+    ## 同じグループのRadioButtonは1つのStringVarを共有する(radiogroupsで引く)
     @group.setter
     def group(self,arg):
+        if self.groupname is not None:
+            radiogroups.leave(self.groupname, self)
         self.groupname = arg
-        radios = [r for r in RadioButton.instances if r.groupname == arg and r.number != self.number]
-        if len(radios) == 0:
-            self.variable = tkinter.StringVar()
-        else:
-            self.variable = radios[0].variable
+        self.variable = radiogroups.join(arg, self)
+
+    def __leave(self, e):
+        if e.widget is self and self.groupname is not None:
+            radiogroups.leave(self.groupname, self)
 
     @property
     def groupvalue(self):
@@ -569,6 +1092,7 @@ class ListBox(MixinLayout,tkinter.Listbox,MixinState,AbstractConfig):
         self.relief = tkinter.SUNKEN
         self.__viewsize = 0 # default height
         self["height"] = 5 # default height
+        self.__limit = 0 # 0なら行数の上限なし
 
     @property
     def values(self):
@@ -576,17 +1100,34 @@ class ListBox(MixinLayout,tkinter.Listbox,MixinState,AbstractConfig):
 
     @values.setter
     def values(self,str_list):
+        if self.__limit != 0 and len(str_list) > self.__limit:
+            str_list = str_list[-self.__limit:]
         self.__values = str_list
         self["listvariable"] = tkinter.StringVar(value=str_list)
         if self.__viewsize == 0:
             self["height"] = len(str_list)
 
+    ## 1行追加する。追加した行だけをinsertするので、行数が増えても遅くならない
     def push(self,arg):
-        vals = self.values
-        vals.append(arg)
-        self.values = vals
+        self.__values.append(arg)
+        self.insert(tkinter.END, arg)
+        if self.__limit != 0 and len(self.__values) > self.__limit:
+            excess = len(self.__values) - self.__limit
+            del self.__values[:excess]
+            self.delete(0, excess - 1)
         if self.__viewsize == 0:
-            self["height"] = len(vals)
+            self["height"] = len(self.__values)
+
+    ## 残しておく行数の上限。超えたら古い行から消す
+    @property
+    def limit(self):
+        return self.__limit
+
+    @limit.setter
+    def limit(self,num):
+        self.__limit = num
+        if num != 0 and len(self.__values) > num:
+            ListBox.values.fset(self, self.__values[-num:])
 
     @property
     def viewsize(self):
@@ -597,6 +1138,101 @@ class ListBox(MixinLayout,tkinter.Listbox,MixinState,AbstractConfig):
         self.__viewsize = arg
         self["height"] = arg
 
+
+## 表示する行だけをListBoxに入れるListBox
+## 全部の行はPythonのリスト(またはlen()と[a:b]ができるもの)に持っておき、
+## スクロールしたときとpush()したフレームの終わりに、見えているviewsize行だけを入れ直す。
+## 末尾を表示しているあいだはpush()で末尾についていく。
+class VirtualListBox(ListBox):
+    # yscrollcommandはTkのListBoxには渡さず、全体の中の位置を自分で知らせる
+    props = tuple(p for p in ListBox.props if p != "yscrollcommand")
+
+    def __init__(self,*parent,**args):
+        ListBox.__init__(self,*parent,**args)
+        self.__source = []
+        self.__top = 0
+        self.__follow = True
+        self.__pending = False
+        self.__yscrollcommand = None
+        self.viewsize = 10
+        self.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    @property
+    def values(self):
+        return self.__source
+
+    @values.setter
+    def values(self,source):
+        self.__source = source
+        self.__top = max(0, len(source) - self.viewsize)
+        self.__follow = True
+        self.__render()
+
+    def push(self,arg):
+        self.__source.append(arg)
+        if self.limit != 0 and len(self.__source) > self.limit:
+            del self.__source[:len(self.__source) - self.limit]
+        if self.__follow:
+            self.__top = max(0, len(self.__source) - self.viewsize)
+        if not self.__pending:
+            self.__pending = True
+            self.after_idle(self.__render)
+
+    @ListBox.limit.setter
+    def limit(self,num):
+        ListBox.limit.fset(self, num)
+        if num != 0 and len(self.__source) > num:
+            del self.__source[:len(self.__source) - num]
+            self.__top = min(self.__top, max(0, len(self.__source) - self.viewsize))
+            self.__render()
+
+    @property
+    def yscrollcommand(self):
+        return self.__yscrollcommand
+
+    @yscrollcommand.setter
+    def yscrollcommand(self,func):
+        self.__yscrollcommand = func
+        self.__notify()
+
+    ## ScrollBarのcommandから呼ばれる(moveto / scroll)
+    def yview(self,*args):
+        total = len(self.__source)
+        if not args:
+            if total == 0:
+                return (0.0, 1.0)
+            return (self.__top / total, min(1.0, (self.__top + self.viewsize) / total))
+        if args[0] == "moveto":
+            top = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = self.viewsize if args[2] == "pages" else 1
+            top = self.__top + int(args[1]) * step
+        else:
+            return
+        last = max(0, total - self.viewsize)
+        self.__top = min(max(top, 0), last)
+        self.__follow = self.__top == last
+        self.__render()
+
+    ## 見えている行のsource上の番号
+    def curselection(self):
+        return tuple(self.__top + i for i in ListBox.curselection(self))
+
+    def __render(self):
+        self.__pending = False
+        rows = self.__source[self.__top:self.__top + self.viewsize]
+        self.delete(0, tkinter.END)
+        if len(rows) > 0:
+            self.insert(0, *rows)
+        self.__notify()
+
+    def __notify(self):
+        if self.__yscrollcommand is not None:
+            first, last = self.yview()
+            self.__yscrollcommand(first, last)
+
 class ScrollBar(MixinLayout,ttk.Scrollbar, AbstractStateTtk, AbstractConfig):
     props = ["command", "orient","style","cursor","takefocus"]
 
@@ -612,7 +1248,7 @@ class ScrollBar(MixinLayout,ttk.Scrollbar, AbstractStateTtk, AbstractConfig):
 
     @target.setter
     def target(self,widget):
-        if widget.__class__.__name__ == "ListBox":
+        if isinstance(widget, ListBox):
             self.command = widget.yview
             self.orient = tkinter.VERTICAL
             widget.yscrollcommand = self.set
@@ -646,6 +1282,93 @@ class Text(MixinLayout,tkinter.Text,MixinState,AbstractConfig):
 class TextBox(Text):
     pass
 
+
+## 追記するだけのログ表示
+## write()/append()は行をためるだけなので、ほかのスレッドから呼んでもよい(sink.ConsoleSinkのoutにできる)。
+## interval ミリ秒ごとに、たまった行をTclを1回呼ぶだけでまとめて追加し、limit行を超えた古い行を消す。
+## 一番下を表示しているときだけ、追加した行までスクロールする。
+class Console(Text):
+
+    ## 1回の描画で行うこと: 一番下を見ていたか調べる → 追加 → 古い行を消す → スクロール
+    _RENDER_SCRIPT = """{w text limit} {
+        set pinned [expr {[lindex [$w yview] 1] >= 1.0}]
+        set state [$w cget -state]
+        $w configure -state normal
+        $w insert end $text
+        set lines [expr {int([$w index end-1c]) - 1}]
+        if {$limit > 0 && $lines > $limit} {
+            $w delete 1.0 [expr {$lines - $limit + 1}].0
+        }
+        $w configure -state $state
+        if {$pinned} { $w yview moveto 1.0 }
+    }"""
+
+    def __init__(self,*parent,limit=10000,interval=33,**args):
+        Text.__init__(self,*parent,**args)
+        self.__limit = limit  # 0なら行数の上限なし
+        self.interval = interval
+        # 描画までに上限を超えてたまった行は、どうせ消すので捨てる
+        self.__pending = deque(maxlen=limit or None)
+        self.__partial = ""
+        self.__after_id = self.after(self.interval, self.__tick)
+        self.bind("<Destroy>", self.__destroyed, add="+")
+        self.state = tkinter.DISABLED
+
+    ## 残しておく行数の上限。超えたら古い行から消す
+    @property
+    def limit(self):
+        return self.__limit
+
+    @limit.setter
+    def limit(self,num):
+        self.__limit = num
+        self.__pending = deque(self.__pending, maxlen=num or None)
+
+    ## 1行追加する
+    def append(self,line):
+        self.__pending.append(str(line))
+
+    ## ファイルと同じように書き、書いた文字数(sの長さ)を返す。改行までを1行としてためる
+    def write(self,s):
+        lines = (self.__partial + s).split("\n")
+        self.__partial = lines.pop()
+        self.__pending.extend(lines)
+        return len(s)
+
+    ## ファイルのflush()の代わり(描画はintervalごとに行う)
+    def flush(self):
+        pass
+
+    ## ためた行をすぐに描く(Tkのスレッドから呼ぶ)
+    def render(self):
+        pending = self.__pending
+        if not pending:
+            return
+        lines = []
+        try:
+            while True:
+                lines.append(pending.popleft())
+        except IndexError:
+            pass
+        self.tk.call("apply", Console._RENDER_SCRIPT, self._w, "\n".join(lines) + "\n", self.__limit)
+
+    def clear(self):
+        self.__pending.clear()
+        self.__partial = ""
+        state = self["state"]
+        self["state"] = tkinter.NORMAL
+        self.delete("1.0", tkinter.END)
+        self["state"] = state
+
+    def __tick(self):
+        self.render()
+        self.__after_id = self.after(self.interval, self.__tick)
+
+    def __destroyed(self, e):
+        if e.widget is self and self.__after_id is not None:
+            self.after_cancel(self.__after_id)
+            self.__after_id = None
+
 # python3.7以上ではttk.Spinboxになっている。
 class Spinbox(MixinLayout,ttk.Spinbox, AbstractStateTtk, AbstractConfig):
     props = ("width","from_","to","increment","values","format","cursor","font","style","takefocus","validate")
@@ -698,6 +1421,7 @@ class Dialog():
     
     @classmethod
     def askQuestion(cls,title,text):
+        from tkinter import simpledialog
         simpledialog.askstring("title","message")
 
     @classmethod
@@ -723,7 +1447,7 @@ class Canvas(tkinter.Canvas):
 
     def oval(self, x0, y0, x1, y1, **options):
         object_id = super().create_oval(x0,y0,x1,y1,**options)
-        return CanvasObject(self,object_id, "oival")
+        return CanvasObject(self,object_id, "oval")
         
 
     def image(self,image, x,y, **options):
@@ -755,7 +1479,7 @@ class CanvasObject(object):
 
     def __getattr__(self,name):
         if name not in CanvasObject.original_props:
-            return self.canvas.itemcget(name)
+            return self.canvas.itemcget(self.object_id, name)
         else:
             print(name)
 
@@ -768,6 +1492,159 @@ class CanvasObject(object):
             object.__setattr__(self,name,value)
 
 
+#== Chart
+## 株価などを流し続けるためのチャート
+## 系列ごとに最新capacity点だけを持ち、横1ピクセルぶんの点を(最小, 最大)にまとめておく。
+## 描くときは系列ごとに1回のcoords()で折れ線を置き換えるだけなので、
+## 点がいくつあっても1フレームの手間は横幅のピクセル数で決まる。
+class ChartSeries():
+
+    def __init__(self, chart, color):
+        self.chart = chart
+        self.item = chart.create_line(0, 0, 0, 0, fill=color)
+        self.points = array("d", bytes(8 * chart.capacity))  # リングバッファ
+        self.head = 0
+        self.count = 0
+        self.rebucket()
+
+    ## 横幅が変わったら、手元の点から1ピクセルぶんのまとまりを作り直す
+    ## まとまりは1点から始め、横幅いっぱいになるたびに隣どうしをまとめて2倍にする。
+    ## 2倍にするとcapacity点より多く並んでしまう大きさ(maxbucketの半分より上)になったら、
+    ## あとは古いまとまりから捨てる(リングバッファにない点は画面にも出さない)。
+    def rebucket(self):
+        width = self.chart.plotwidth()
+        self.width = width
+        self.maxbucket = max(1, self.chart.capacity // width)  # 横幅 x maxbucket <= capacity
+        self.limit = min(width, self.chart.capacity)  # まとまりの数の上限
+        self.bucketsize = 1
+        self.buckets = deque()
+        self.current = None
+        self.filled = 0
+        cap = self.chart.capacity
+        start = (self.head - self.count) % cap
+        for k in range(self.count):
+            self.__add(self.points[(start + k) % cap])
+
+    def __add(self, v):
+        if self.current is None:
+            self.current = [v, v]
+        else:
+            if v < self.current[0]:
+                self.current[0] = v
+            if v > self.current[1]:
+                self.current[1] = v
+        self.filled += 1
+        if self.filled == self.bucketsize:
+            self.buckets.append(tuple(self.current))
+            self.current = None
+            self.filled = 0
+            if len(self.buckets) >= self.limit:
+                if 2 * self.bucketsize <= self.maxbucket:
+                    self.__merge()
+                else:
+                    self.buckets.popleft()
+
+    ## 隣り合う2つのまとまりを1つにして、まとまりの大きさを2倍にする
+    def __merge(self):
+        old = self.buckets
+        merged = deque()
+        for k in range(0, len(old) - 1, 2):
+            a = old[k]
+            b = old[k + 1]
+            merged.append((min(a[0], b[0]), max(a[1], b[1])))
+        if len(old) % 2:
+            # 余った1つは、途中まで埋まった新しいまとまりにする
+            self.current = list(old[-1])
+            self.filled = self.bucketsize
+        self.buckets = merged
+        self.bucketsize *= 2
+
+    def push(self, v):
+        v = float(v)
+        cap = self.chart.capacity
+        self.points[self.head] = v
+        self.head = (self.head + 1) % cap
+        if self.count < cap:
+            self.count += 1
+        self.__add(v)
+
+    def ranges(self):
+        if self.current is None:
+            return self.buckets
+        return list(self.buckets) + [tuple(self.current)]
+
+
+class Chart(Canvas):
+
+    def __init__(self, *parent, capacity=100000, fps=60, **args):
+        super().__init__(*parent, **args)
+        self.capacity = capacity
+        self.fps = fps
+        self.series = []
+        self.__scheduled = False
+        self.__width = None
+        self.bind("<Configure>", self.__resize, add="+")
+
+    def plotwidth(self):
+        width = self.winfo_width()
+        if width <= 1:
+            width = int(self["width"])
+        return max(2, width)
+
+    ## 系列を1本足して、その番号を返す
+    def add(self, color="black"):
+        self.series.append(ChartSeries(self, color))
+        return len(self.series) - 1
+
+    ## 系列の順に1点ずつ足す(系列が足りなければ足す)
+    def push(self, *values):
+        while len(self.series) < len(values):
+            self.add()
+        for series, v in zip(self.series, values):
+            series.push(v)
+        self.__schedule()
+
+    def __schedule(self):
+        if not self.__scheduled:
+            self.__scheduled = True
+            self.after(max(1, 1000 // self.fps), self.draw)
+
+    def __resize(self, e):
+        if e.widget is self and e.width != self.__width:
+            self.__width = e.width
+            for series in self.series:
+                series.rebucket()
+            self.__schedule()
+
+    def draw(self):
+        self.__scheduled = False
+        ranges = [series.ranges() for series in self.series]
+        lo = min((r[0] for rs in ranges for r in rs), default=None)
+        hi = max((r[1] for rs in ranges for r in rs), default=None)
+        if lo is None:
+            return
+        if hi == lo:
+            hi = lo + 1
+        width = self.plotwidth()
+        height = max(2, self.winfo_height() if self.winfo_height() > 1 else int(self["height"]))
+        scale = (height - 1) / (hi - lo)
+        for series, rs in zip(self.series, ranges):
+            coords = []
+            for x, (mn, mx) in enumerate(rs):
+                coords.append(x)
+                coords.append(height - 1 - (mn - lo) * scale)
+                coords.append(x)
+                coords.append(height - 1 - (mx - lo) * scale)
+            if len(coords) < 4:
+                coords = [0, 0, 0, 0]
+            self.coords(series.item, *coords)
+
+    def clear(self):
+        for series in self.series:
+            self.delete(series.item)
+        self.series = []
+
+
 #== Sound
 class Sound():
     
@@ -775,6 +1652,7 @@ class Sound():
         self.wf = wavefilepath
 
     def play(self):
+        import platform
         if platform.system() == "Windows":
             # for Windows
             import winsound
@@ -787,6 +1665,7 @@ class Sound():
             pass
 
     def playuntildone(self):
+        import platform
         if platform.system() == "Windows":
             # for Windows
             import winsound
@@ -797,3 +1676,41 @@ class Sound():
             subprocess.run(["afplay", self.wf])
         else:
             pass
+
+
+#== 最初に使うときに読み込むもの
+## Fontはtkinter.fontを継承するので、tentoapp.Fontを最初に触ったときにクラスを作る
+def _font():
+    import tkinter.font as font
+
+    class Font(font.Font, AbstractConfig):
+        props = ("family", "size", "weight","slant", "underline","overstrike")
+        def __init__(self,*parent,**args):
+            ttk.Frame.__init__(self,*parent,**args)
+            AbstractConfig.__init__(self)
+
+    Font.__qualname__ = "Font"
+    return Font
+
+def _filedialog():
+    from tkinter import filedialog
+    return filedialog
+
+def _simpledialog():
+    from tkinter import simpledialog
+    return simpledialog
+
+def _messagebox():
+    from tkinter import messagebox
+    return messagebox
+
+_lazy = {"Font": _font, "filedialog": _filedialog,
+         "simpledialog": _simpledialog, "messagebox": _messagebox}
+
+def __getattr__(name):
+    make = _lazy.get(name)
+    if make is None:
+        raise AttributeError("module 'tentoapp' has no attribute " + repr(name))
+    value = make()
+    globals()[name] = value
+    return value
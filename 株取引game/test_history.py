@@ -0,0 +1,74 @@
+import numpy as np
+
+from history import History, HistorySink
+from market import Market, Portfolio
+
+
+## n tick動かしながらsinkに書き、書いた行をそのまま返す
+def write(sink, market, portfolio, ticks):
+    rows = []
+    for _ in range(ticks):
+        market.x()
+        sink.tick(market, portfolio)
+        rows.append([market.tick] + market.kabuka.tolist() + portfolio.motika.tolist() + [portfolio.kane])
+    return rows
+
+
+def check(history, rows):
+    rows = np.array(rows, dtype=np.int64)
+    n = history.n
+    assert len(history) == len(rows)
+    assert (history.tick == rows[:, 0]).all()
+    assert (history.kabuka() == rows[:, 1:1 + n]).all()
+    assert (history.motika() == rows[:, 1 + n:1 + 2 * n]).all()
+    assert (history.kane == rows[:, -1]).all()
+    for i in range(n):
+        assert (history.kabuka(i) == rows[:, 1 + i]).all()
+
+
+def test_columns_are_zero_copy_views(tmp_path):
+    path = str(tmp_path / "h.bin")
+    market = Market(seed=1)
+    sink = HistorySink(path, len(market), block=16, capacity=1000)
+    rows = write(sink, market, Portfolio(market), 500)
+    sink.close()
+    history = History(path)
+    check(history, rows)
+    column = history.kabuka(1)
+    assert column.flags.c_contiguous
+    assert np.shares_memory(column, history.columns)
+    assert np.shares_memory(history.kabuka(), history.columns)
+
+
+def test_reopen_partially_written_block(tmp_path):
+    path = str(tmp_path / "h.bin")
+    market = Market(seed=2)
+    portfolio = Portfolio(market)
+    sink = HistorySink(path, len(market), block=16, interval=0)
+    rows = write(sink, market, portfolio, 21)
+    # interval=0なのでブロックの途中でも書かれていて、読む側から見える
+    check(History(path), rows)
+    sink.close()
+    sink = HistorySink(path, len(market), block=16)
+    rows += write(sink, market, portfolio, 30)
+    sink.close()
+    check(History(path), rows)
+
+
+def test_grow_past_capacity(tmp_path):
+    path = str(tmp_path / "h.bin")
+    market = Market(seed=3)
+    portfolio = Portfolio(market)
+    sink = HistorySink(path, len(market), block=7, capacity=10)
+    rows = write(sink, market, portfolio, 5)
+    sink.flush()
+    before = History(path)
+    rows += write(sink, market, portfolio, 100)
+    sink.close()
+    history = History(path)
+    assert history.capacity >= 105
+    check(history, rows)
+    # 置きかえる前に開いたものは、そのときの行をそのまま読める
+    check(before, rows[:5])
+    before.refresh()
+    check(before, rows)
@@ -0,0 +1,120 @@
+import pytest
+
+from market import KAU, URU, Market, Order, OrderQueue, Portfolio, PriceEngine
+from sink import Sink
+
+
+## 株価を決めた市場(x()を呼ばなければ株価は変わらない)
+def market(kabuka=(1000, 300, 0)):
+    return Market(engine=PriceEngine(kabuka, [1] * len(kabuka), [100] * len(kabuka)))
+
+
+class Trades(Sink):
+
+    def __init__(self):
+        self.trades = []
+
+    def trade(self, portfolio, i, side, qty, price):
+        self.trades.append((i, side, qty, price))
+
+
+def test_buy_max_affordable():
+    m = market()
+    p = Portfolio(m, kane=2500)
+    q = OrderQueue(m)
+    o = q.buy(p, 0)
+    assert q.match() == [o]
+    assert (o.filled, o.price) == (2, 1000)
+    assert p.kane == 500
+    assert p.motika.tolist() == [2, 0, 0]
+    assert len(q) == 0
+
+
+def test_buy_partial_fill():
+    m = market()
+    p = Portfolio(m, kane=1000)
+    q = OrderQueue(m)
+    o = q.buy(p, 1, 5)
+    q.match()
+    assert o.filled == 3
+    assert p.kane == 100
+    assert p.motika[1] == 3
+
+
+def test_buy_less_than_affordable():
+    m = market()
+    p = Portfolio(m, kane=10000)
+    q = OrderQueue(m)
+    o = q.buy(p, 1, 2)
+    q.match()
+    assert o.filled == 2
+    assert p.kane == 10000 - 600
+
+
+def test_orders_match_in_submit_order():
+    m = market()
+    p = Portfolio(m, kane=1300)
+    q = OrderQueue(m)
+    first = q.buy(p, 0)
+    second = q.buy(p, 1)
+    third = q.buy(p, 1)
+    q.match()
+    # 先の注文で使った残りで次の注文を約定させる
+    assert (first.filled, second.filled, third.filled) == (1, 1, 0)
+    assert p.kane == 0
+
+
+def test_sell_partial_and_all():
+    m = market()
+    p = Portfolio(m, kane=0)
+    p.motika[0] = 3
+    p.motika[1] = 4
+    q = OrderQueue(m)
+    some = q.sell(p, 0, 5)
+    everything = q.sell(p, 1)
+    q.match()
+    assert (some.filled, everything.filled) == (3, 4)
+    assert p.motika.tolist() == [0, 0, 0]
+    assert p.kane == 3 * 1000 + 4 * 300
+
+
+def test_no_fill_at_non_positive_price():
+    m = market()
+    p = Portfolio(m, kane=10 ** 9)
+    q = OrderQueue(m)
+    o = q.buy(p, 2)
+    q.match()
+    assert o.filled == 0
+    assert p.kane == 10 ** 9
+
+
+def test_bulk_and_sink():
+    m = market()
+    sink = Trades()
+    p = Portfolio(m, kane=2000, sink=sink)
+    q = OrderQueue(m)
+    orders = q.bulk(p, KAU, [1, 0, None])
+    # 0株の注文は出さない
+    assert [o.i for o in orders] == [0, 2]
+    q.match()
+    assert sink.trades == [(0, KAU, 1, 1000)]
+
+
+def test_cancel():
+    m = market()
+    p = Portfolio(m)
+    other = Portfolio(m)
+    q = OrderQueue(m)
+    q.buy(p, 0)
+    kept = q.buy(other, 0)
+    q.sell(p, 1)
+    assert q.cancel(p) == 2
+    assert q.orders == [kept]
+
+
+def test_order_rejects_bad_arguments():
+    p = Portfolio(market())
+    with pytest.raises(ValueError):
+        Order(p, 0, "hold")
+    with pytest.raises(ValueError):
+        Order(p, 0, URU, -1)
@@ -0,0 +1,36 @@
+import pytest
+
+import headless
+from market import Market, Portfolio
+from replay import Recorder, Replayer
+
+
+## seedとpolicyで記録したセッション
+def record(seed, ticks, policy, every):
+    market = Market(seed)
+    portfolio = Portfolio(market)
+    recorder = Recorder(market, portfolio, every=every)
+    headless.run(seed, ticks, policy, market, portfolio, sink=recorder)
+    return recorder
+
+
+@pytest.mark.parametrize("policy", ["none", "random", "yasukau"])
+@pytest.mark.parametrize("n", [0, 1, 99, 100, 101, 250, 999])
+def test_seek_matches_fresh_run(policy, n):
+    replayer = Replayer.from_recorder(record(7, 1000, policy, every=100))
+    market, portfolio = replayer.seek(n)
+    fresh, fresh_portfolio = headless.run(7, n, policy)
+    assert market.tick == fresh.tick == n
+    assert market.kabuka.tolist() == fresh.kabuka.tolist()
+    assert market.rng.getstate() == fresh.rng.getstate()
+    assert portfolio.kane == fresh_portfolio.kane
+    assert portfolio.motika.tolist() == fresh_portfolio.motika.tolist()
+
+
+def test_seek_through_saved_file(tmp_path):
+    path = str(tmp_path / "record.json")
+    record(3, 300, "random", every=50).save(path)
+    market, portfolio = Replayer.load(path).seek(175)
+    fresh, fresh_portfolio = headless.run(3, 175, "random")
+    assert market.kabuka.tolist() == fresh.kabuka.tolist()
+    assert portfolio.kane == fresh_portfolio.kane
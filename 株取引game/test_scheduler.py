@@ -0,0 +1,135 @@
+import pytest
+
+import scheduler
+from scheduler import Scheduler
+
+
+## after()/after_cancel()だけを持つTkの代わり。時計は手で進める
+class FakeWindow():
+
+    def __init__(self):
+        self.now = 0.0
+        self.count = 0
+        self.pending = {}  # after_id -> (delay, func)
+
+    def clock(self):
+        return self.now
+
+    def after(self, delay, func):
+        self.count += 1
+        after_id = "after#%d" % self.count
+        self.pending[after_id] = (delay, func)
+        return after_id
+
+    def after_cancel(self, after_id):
+        del self.pending[after_id]
+
+    ## 時計をtにして、待っているコールバックを全部呼ぶ
+    def fire(self, t):
+        self.now = t
+        pending = self.pending
+        self.pending = {}
+        for delay, func in pending.values():
+            func()
+
+
+@pytest.fixture
+def window(monkeypatch):
+    w = FakeWindow()
+    monkeypatch.setattr(scheduler.time, "perf_counter", w.clock)
+    return w
+
+
+def test_runs_on_grid(window):
+    calls = []
+    job = Scheduler(window).every(100, lambda: calls.append(window.now))
+    assert list(window.pending.values()) == [(100, job)]
+    window.fire(0.13)
+    assert calls == [0.13]
+    assert job.late == pytest.approx(0.03)
+    # 遅れて呼ばれても、次は0.13 + 0.1ではなく格子の上の0.2
+    assert job.next == pytest.approx(0.2)
+    assert [d for d, _ in window.pending.values()] == [70]
+
+
+def test_coalesce_missed_ticks(window):
+    calls = []
+    job = Scheduler(window).every(100, lambda: calls.append(window.now))
+    window.fire(0.35)
+    assert len(calls) == 1
+    assert (job.runs, job.missed) == (1, 2)
+    assert job.next == pytest.approx(0.4)
+    assert job.report()["max_late_ms"] == pytest.approx(250)
+
+
+def test_burst_without_coalesce(window):
+    calls = []
+    s = Scheduler(window)
+    job = s.every(100, lambda: calls.append(1), coalesce=False)
+    window.fire(0.35)
+    assert (len(calls), job.missed) == (3, 0)
+    limited = s.every(100, lambda: calls.append(2), coalesce=False, maxburst=2)
+    window.fire(0.85)
+    assert calls.count(2) == 2
+    assert limited.missed == 3
+
+
+def test_speed_reanchors_remaining_time(window):
+    s = Scheduler(window)
+    job = s.every(100, lambda: None)
+    window.now = 0.04
+    s.speed = 2
+    # 残りの60ms(speed=1での時間)を2倍速で30ms
+    assert job.next == pytest.approx(0.07)
+    assert [d for d, _ in window.pending.values()] == [30]
+    window.fire(0.07)
+    assert job.next == pytest.approx(0.12)
+
+
+def test_pause_and_resume(window):
+    calls = []
+    s = Scheduler(window)
+    job = s.every(100, lambda: calls.append(window.now))
+    window.now = 0.025
+    s.speed = 0
+    assert s.paused
+    assert window.pending == {}
+    assert job.left == pytest.approx(0.075)
+    window.fire(10.0)
+    assert calls == []
+    s.speed = 1
+    assert job.next == pytest.approx(10.075)
+    window.fire(10.075)
+    assert calls == [10.075]
+    # 止めたあとに登録したものは、再開したときに1間隔ぶん後から始まる
+    s.speed = 0
+    later = s.every(200, lambda: None)
+    s.speed = 1
+    assert later.next == pytest.approx(10.275)
+
+
+def test_speed_out_of_range(window):
+    s = Scheduler(window)
+    with pytest.raises(ValueError):
+        s.speed = -1
+    with pytest.raises(ValueError):
+        s.speed = Scheduler.MAXSPEED + 1
+
+
+def test_cancel_inside_job(window):
+    s = Scheduler(window)
+    calls = []
+    def once():
+        calls.append(1)
+        job.cancel()
+    job = s.every(100, once)
+    window.fire(0.1)
+    assert calls == [1]
+    assert window.pending == {}
+    assert s.jobs == []
+
+
+def test_advance():
+    assert scheduler.advance(1.0, 0.5, 0.25) == (1.25, 1)
+    assert scheduler.advance(1.0, 1.0, 0.25) == (1.25, 1)
+    assert scheduler.advance(1.0, 1.6, 0.25) == (1.75, 3)
@@ -0,0 +1,40 @@
+import pytest
+
+import headless
+import snapshot
+from market import Market, Portfolio
+
+
+def state(market, portfolio):
+    return (market.tick, market.q, market.kabuka.tolist(), market.engine.resets.tolist(),
+            portfolio.kane, portfolio.motika.tolist())
+
+
+@pytest.mark.parametrize("policy", ["none", "random"])
+def test_loads_continues_in_lockstep(policy):
+    market, portfolio = headless.run(5, 500, policy)
+    copy, copy_portfolio = snapshot.loads(snapshot.dumps(market, portfolio))
+    assert state(copy, copy_portfolio) == state(market, portfolio)
+    for _ in range(500):
+        for m, p in ((market, portfolio), (copy, copy_portfolio)):
+            m.x()
+            p.haitou()
+        assert state(copy, copy_portfolio) == state(market, portfolio)
+    assert copy.rng.getstate() == market.rng.getstate()
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "game.snap")
+    market, portfolio = headless.run(1, 100, "random")
+    snapshot.save(path, market, portfolio)
+    copy, copy_portfolio = snapshot.load(path)
+    assert state(copy, copy_portfolio) == state(market, portfolio)
+
+
+def test_loads_rejects_broken_data():
+    data = bytearray(snapshot.dumps(Market(0), Portfolio(Market(0))))
+    with pytest.raises(ValueError):
+        snapshot.loads(bytes(data[:10]))
+    data[20] ^= 1
+    with pytest.raises(ValueError):
+        snapshot.loads(bytes(data))
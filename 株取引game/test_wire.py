@@ -0,0 +1,48 @@
+import random
+
+import numpy as np
+import pytest
+
+from wire import SMALL, Decoder, Encoder
+
+
+def walk(n, ticks, seed):
+    rng = random.Random(seed)
+    kabuka = [rng.randrange(1, 5000) for _ in range(n)]
+    for _ in range(ticks):
+        # 半分くらいの銘柄だけ動かす。0以下や大きな値もまぜる
+        for i in range(n):
+            if rng.random() < 0.5:
+                kabuka[i] += rng.choice((-1, 1)) * rng.choice((1, 7, 300, 1 << 40))
+        yield list(kabuka)
+
+
+@pytest.mark.parametrize("n", [1, 3, SMALL - 1, SMALL, SMALL + 1, 1000])
+@pytest.mark.parametrize("timestamp", [False, True])
+def test_roundtrip(n, timestamp):
+    encoder = Encoder(n, keyframe=10, timestamp=timestamp)
+    decoder = Decoder()
+    for tick, kabuka in enumerate(walk(n, 35, n), 1):
+        decoded = decoder.decode(encoder.encode(tick, kabuka, ts=tick / 2))
+        assert decoder.tick == tick
+        assert np.asarray(decoded).tolist() == kabuka
+        if timestamp:
+            assert decoder.ts == tick / 2
+
+
+@pytest.mark.parametrize("n", [SMALL - 1, SMALL])
+def test_decode_from_reset(n):
+    ticks = list(walk(n, 5, 0))
+    encoder = Encoder(n, keyframe=100)
+    frames = [encoder.encode(tick, kabuka) for tick, kabuka in enumerate(ticks, 1)]
+    decoder = Decoder()
+    decoder.reset(2, ticks[1])
+    for tick in range(3, 6):
+        assert np.asarray(decoder.decode(frames[tick - 1])).tolist() == ticks[tick - 1]
+
+
+def test_delta_before_keyframe():
+    encoder = Encoder(3)
+    encoder.encode(1, [1, 2, 3])
+    with pytest.raises(ValueError):
+        Decoder().decode(encoder.encode(2, [1, 2, 4]))
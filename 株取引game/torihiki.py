@@ -1,157 +1,159 @@
-import random
+import os
 import time
 
-from tentoapp import *
+from tentoapp import App, Button, Chart, Console, Label, Spinbox
+from market import KAU, Market, Portfolio
+from sink import ConsoleSink
+from scheduler import Scheduler
+from worker import MarketWorker
+import snapshot
 
 print("このコンテンツはTentoAppによって作られました   https://speakerdeck.com/anoato/xue-xi-yong-guiraiburaritentoapp-jia-nituite") 
+## 市場のスレッドから届いたSnapshotを画面に出す
 def x():
-    global kabuka,kane,motika,kabuka2,motika2,kabuka3,motika3,q
-    q=int(random.randint(-10,10))
-    if kabuka>0:
-        kabuka=kabuka+int((q*q*q)/5)
+    global saigotick
+    snaps=worker.drain()
+    for snap in snaps:
+        if snap.tick!=saigotick:
+            saigotick=snap.tick
+            chart.push(*snap.kabuka)
+        for i,side,qty,filled in snap.fills:
+            if filled==0:
+                log.append("購入できません" if side==KAU else "売却できません")
+    if snaps:
+        a1.text=snaps[-1].kabuka[0]
+        a2.text=snaps[-1].kabuka[1]
+        a3.text=snaps[-1].kabuka[2]
+
+## i番目の株を数量の分だけ買う(足りなければ買えるだけ)
+def ko(i):
+    worker.buy(i,kazu.value)
+
+## i番目の株を数量の分だけ売る(足りなければ持っているだけ)
+def ur(i):
+    worker.sell(i,kazu.value)
+
+## 市場の速さを変える(0で一時停止)
+def hayasa(speed):
+    worker.speed=min(max(speed,0),Scheduler.MAXSPEED)
+    print("速さは"+str(worker.speed)+"倍")
+
+def teisi():
+    global saigo
+    if worker.speed==0:
+        hayasa(saigo)
     else:
-        kabuka=100
-    if kabuka2>0:
-        kabuka2=kabuka2+int((q*q*q)/2)
-    else:
-        kabuka2=200
-    if kabuka3>0:
-        kabuka3=kabuka3+int((q*q*q)/1)
-    else:
-        kabuka3=200
-    kane=kane+round(motika*kabuka*0.0005)
-    kane=kane+round(motika*kabuka2*0.0005)
-    kane=kane+round(motika*kabuka3*0.0005)
-
-    a1.text=kabuka
-    a2.text=kabuka2
-    a3.text=kabuka3
-    print("株1は"+str(kabuka))
-    print("株2は"+str(kabuka2))
-    print("株3は"+str(kabuka3))
-    print("持ち株1は"+str(motika))
-    print("持ち株2は"+str(motika2))
-    print("持ち株3は"+str(motika3))
-    print("残金は"+str(kane))
-    app.after(1000,x)
-
-def ko():
-    global kabuka,kane,motika
-    if kane>kabuka or kabuka==kane:
-        kane=kane-kabuka
-        motika=motika+1
-        print("購入できました")
-    else:
-        print("購入できません")
-
-
-def ur():
-    global kabuka,kane,motika
-    if motika>0:
-        kane=kane+kabuka
-        motika=motika-1
-        print("購入できました")
-
-    else:
-        print("売却できません")
-
-def ko2():
-    global kabuka2,kane,motika2
-    if kane>kabuka2 or kabuka2==kane:
-        kane=kane-kabuka2
-        motika2=motika2+1
-        print("購入できました")
-
-    else:
-        print("購入できません")
-
-
-def ur2():
-    global kabuka2,kane,motika2
-    if motika2>0:
-        kane=kane+kabuka2
-        motika2=motika2-1
-        print("持ち株2は"+str(motika2))
-        print("残金は"+str(kane))
-    else:
-        print("売却できません")
-
-def ko3():
-    global kabuka3,kane,motika3
-    if kane>kabuka3 or kabuka3==kane:
-        kane=kane-kabuka3
-        motika3=motika3+1
-        print("購入できました")
-
-    else:
-        print("購入できません")
-
-
-def ur3():
-    global kabuka3,kane,motika3
-    if motika3>0:
-        kane=kane+kabuka3
-        motika3=motika3-1
-        print("購入できました")
-
-    else:
-        print("売却できません")
-
-kabuka=1000
-motika=0
-kabuka2=5000
-motika2=0
-kabuka3=10000
-motika3=0
-kane=20000
-q=0
+        saigo=worker.speed
+        hayasa(0)
+
+saigo=1
+saigotick=None
+## 株価の表示は0.5秒に1回まで(1tickごと)、売買の表示は0.5秒に10件まで
+console=ConsoleSink(interval=0.5)
+## 前回の続きがあればそこから始める
+hozon=os.path.join(os.path.dirname(os.path.abspath(__file__)),"torihiki.snap")
+try:
+    market,player=snapshot.load(hozon)
+    player.sink=console
+    print(str(market.tick)+"tick目から再開します")
+except FileNotFoundError:
+    market=Market()
+    player=Portfolio(market,sink=console)
+except ValueError as e:
+    print("前回のデータが読めないので最初から始めます: "+str(e))
+    market=Market()
+    player=Portfolio(market,sink=console)
+## 市場は別スレッドで1秒に1tick動かす
+worker=MarketWorker(market,player,interval=1.0,sink=console)
+## 10秒ごとに別スレッドで保存する
+hozonsuru=snapshot.Snapshotter(worker,hozon,interval=10.0)
 
 app = App()
+app.coalesce = True
+
+kazu = Spinbox(app)
+kazu.min = 1
+kazu.max = 100000
+kazu.value = 1
+kazu.pack()
 
 b1 = Button(app)
 b1.text = "購入"
-b1.onclick=ko
+b1.onclick=lambda:ko(0)
 b1.pack()
 
 b2 = Button(app)
 b2.text = "売却"
-b2.onclick=ur
+b2.onclick=lambda:ur(0)
 b2.pack()
 
 
 a1=Label(app)
-a1.text=kabuka
+a1.text=market.kabuka[0]
 a1.pack()
 
 c1 = Button(app)
 c1.text = "購入"
-c1.onclick=ko2
+c1.onclick=lambda:ko(1)
 c1.pack()
 
 c2 = Button(app)
 c2.text = "売却"
-c2.onclick=ur2
+c2.onclick=lambda:ur(1)
 c2.pack()
 
 a2=Label(app)
-a2.text=kabuka2
+a2.text=market.kabuka[1]
 a2.pack()
 
 d1 = Button(app)
 d1.text = "購入"
-d1.onclick=ko3
+d1.onclick=lambda:ko(2)
 d1.pack()
 
 d2 = Button(app)
 d2.text = "売却"
-d2.onclick=ur3
+d2.onclick=lambda:ur(2)
 d2.pack()
 
 a3=Label(app)
-a3.text=kabuka3
+a3.text=market.kabuka[2]
 a3.pack()
 
-app.after(1000,x)
+chart=Chart(app,width=400,height=150,background="white")
+chart.add("red")
+chart.add("green")
+chart.add("blue")
+chart.pack()
+
+## 株価と売買の記録(古いものは1000行まで残す)
+log=Console(app,limit=1000,height=8,width=50)
+log.pack()
+console.out=log
+
+e1 = Button(app)
+e1.text = "遅く"
+e1.onclick=lambda:hayasa(worker.speed/2)
+e1.pack()
+
+e2 = Button(app)
+e2.text = "速く"
+e2.onclick=lambda:hayasa(worker.speed*2)
+e2.pack()
+
+e3 = Button(app)
+e3.text = "停止/再開"
+e3.onclick=teisi
+e3.pack()
+
+worker.start()
+hozonsuru.start()
+app.scheduler.every(30,x)
 app.start()
+hozonsuru.stop(1)
+worker.stop(1)
+## 市場のスレッドが止まったので、最後の状態をここで保存する
+if not worker.is_alive():
+    snapshot.save(hozon,market,player)
 
 input()
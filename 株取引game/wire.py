@@ -0,0 +1,211 @@
+import struct
+
+import numpy as np
+
+## tickを配るときのバイナリ形式
+##  ヘッダ(固定 10バイト, little endian)
+##   magic  u8   0x4B ("K")
+##   kind   u8   0 = 差分, 1 = keyframe, +0x80 = ヘッダのあとに送った時刻(f64, 秒)がある
+##   tick   u32
+##   count  u32  keyframeなら銘柄数、差分なら変わった銘柄の数
+##  本体(どれもvarint。符号つきのものはzigzag)
+##   keyframe  株価 x count
+##   差分      (前に変わった銘柄からいくつ先か - 1, 株価の増減) x count
+## 差分は前のtickに比べて変わった銘柄だけを送る。keyframe tickごと(と最初)には全部送る。
+
+MAGIC = 0x4B
+DELTA = 0
+KEY = 1
+TIMESTAMP = 0x80
+HEADER = struct.Struct("<BBII")
+TS = struct.Struct("<d")
+
+## 銘柄がこれより少ないときはnumpyを使わないほうが速い
+SMALL = 256
+
+
+#== varint
+def zigzag(v):
+    v = np.asarray(v, dtype=np.int64)
+    return ((v << 1) ^ (v >> 63)).astype(np.uint64)
+
+def unzigzag(u):
+    u = np.asarray(u, dtype=np.uint64)
+    return ((u >> np.uint64(1)).astype(np.int64)) ^ -((u & np.uint64(1)).astype(np.int64))
+
+def _put(out, u):
+    while u >= 0x80:
+        out.append((u & 0x7F) | 0x80)
+        u >>= 7
+    out.append(u)
+
+## 0以上の整数の並びをvarintのbytesにする
+def varints(u):
+    if len(u) < SMALL:
+        out = bytearray()
+        for x in u.tolist():
+            _put(out, x)
+        return bytes(out)
+    u = np.asarray(u, dtype=np.uint64)
+    if len(u) == 0:
+        return b""
+    nbytes = np.ones(len(u), dtype=np.int64)
+    top = int(u.max())
+    k = 1
+    while k < 10 and top >= 1 << (7 * k):
+        nbytes += u >= np.uint64(1 << (7 * k))
+        k += 1
+    # (値の数, 最大バイト数)の表を作り、使うところだけを行の順に取り出す
+    cols = np.arange(int(nbytes.max()))
+    table = ((u[:, None] >> (np.uint64(7) * cols.astype(np.uint64))) & np.uint64(0x7F)).astype(np.uint8)
+    table[cols < nbytes[:, None] - 1] |= 0x80
+    return table[cols < nbytes[:, None]].tobytes()
+
+## varintをcount個読み、(値の並び, 読み終わった位置)を返す
+## countがSMALLより少なければlist、多ければnumpyの配列
+def read_varints(data, offset, count):
+    if count < SMALL:
+        vals = []
+        pos = offset
+        for _ in range(count):
+            shift = 0
+            x = 0
+            while True:
+                b = data[pos]
+                pos += 1
+                x |= (b & 0x7F) << shift
+                if b < 0x80:
+                    break
+                shift += 7
+            vals.append(x)
+        return vals, pos
+    b = np.frombuffer(data, dtype=np.uint8, offset=offset)
+    ends = np.flatnonzero(b < 0x80)[:count]
+    if len(ends) < count:
+        raise ValueError("データが途中で切れています")
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64), offset
+    b = b[:int(ends[-1]) + 1]
+    starts = np.empty(count, dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # 各バイトが何番目の値の何バイト目かを求めて、7ビットずつずらして足す
+    which = np.zeros(len(b), dtype=np.int64)
+    which[starts[1:]] = 1
+    which = np.cumsum(which)
+    shift = (np.arange(len(b)) - starts[which]) * 7
+    parts = (b & 0x7F).astype(np.uint64) << shift.astype(np.uint64)
+    return np.add.reduceat(parts, starts), offset + len(b)
+
+
+## 株価の並びを1tickずつbytesにする
+class Encoder():
+
+    def __init__(self, n, keyframe=100, timestamp=False):
+        self.n = n
+        self.keyframe = keyframe
+        self.timestamp = timestamp
+        self.prev = None
+
+    def encode(self, tick, kabuka, ts=None):
+        flag = TIMESTAMP if self.timestamp else 0
+        if self.n < SMALL:
+            head, body = self.__small(tick, kabuka, flag)
+        else:
+            head, body = self.__large(tick, kabuka, flag)
+        if self.timestamp:
+            return head + TS.pack(ts if ts is not None else 0.0) + body
+        return head + body
+
+    ## 銘柄が少ないときはPythonのintのまま
+    def __small(self, tick, kabuka, flag):
+        if not isinstance(kabuka, list):
+            kabuka = np.asarray(kabuka).tolist()
+        out = bytearray()
+        if self.prev is None or tick % self.keyframe == 0:
+            head = HEADER.pack(MAGIC, KEY | flag, tick, self.n)
+            for k in kabuka:
+                _put(out, (k << 1) ^ (k >> 63))
+        else:
+            count = 0
+            last = -1
+            for i, (k, old) in enumerate(zip(kabuka, self.prev)):
+                if k != old:
+                    d = k - old
+                    _put(out, i - last - 1)
+                    _put(out, (d << 1) ^ (d >> 63))
+                    last = i
+                    count += 1
+            head = HEADER.pack(MAGIC, DELTA | flag, tick, count)
+        self.prev = list(kabuka)
+        return head, bytes(out)
+
+    def __large(self, tick, kabuka, flag):
+        kabuka = np.asarray(kabuka, dtype=np.int64)
+        if self.prev is None or tick % self.keyframe == 0:
+            head = HEADER.pack(MAGIC, KEY | flag, tick, self.n)
+            body = varints(zigzag(kabuka))
+        else:
+            changed = np.flatnonzero(kabuka != self.prev)
+            gaps = np.diff(changed, prepend=-1) - 1
+            pairs = np.empty(2 * len(changed), dtype=np.uint64)
+            pairs[0::2] = gaps.astype(np.uint64)
+            pairs[1::2] = zigzag(kabuka[changed] - self.prev[changed])
+            head = HEADER.pack(MAGIC, DELTA | flag, tick, len(changed))
+            body = varints(pairs)
+        self.prev = kabuka.copy()
+        return head, body
+
+
+## Encoderのbytesから株価の並びを元に戻す
+## 株価は銘柄がSMALLより少なければlist、多ければnumpyの配列で持つ
+class Decoder():
+
+    def __init__(self):
+        self.kabuka = None
+        self.tick = None
+        self.ts = None
+
+    ## 途中から受け取るとき、最初の株価を別の方法(サーバのhelloなど)で知らせる
+    def reset(self, tick, kabuka):
+        self.tick = tick
+        if len(kabuka) < SMALL:
+            self.kabuka = [int(k) for k in kabuka]
+        else:
+            self.kabuka = np.array(kabuka, dtype=np.int64)
+
+    def decode(self, data):
+        magic, kind, tick, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("tickのデータではありません")
+        pos = HEADER.size
+        if kind & TIMESTAMP:
+            self.ts = TS.unpack_from(data, pos)[0]
+            pos += TS.size
+        kind &= ~TIMESTAMP
+        if kind == KEY:
+            vals, _ = read_varints(data, pos, count)
+            if count < SMALL:
+                self.kabuka = [(u >> 1) ^ -(u & 1) for u in vals]
+            else:
+                self.kabuka = unzigzag(vals)
+        elif kind == DELTA:
+            if self.kabuka is None:
+                raise ValueError("keyframeより前に差分を受け取りました")
+            vals, _ = read_varints(data, pos, 2 * count)
+            if isinstance(self.kabuka, list):
+                if isinstance(vals, np.ndarray):
+                    vals = vals.tolist()
+                i = -1
+                for k in range(count):
+                    i += vals[2 * k] + 1
+                    u = vals[2 * k + 1]
+                    self.kabuka[i] += (u >> 1) ^ -(u & 1)
+            else:
+                vals = np.asarray(vals, dtype=np.uint64)
+                idx = np.cumsum(vals[0::2].astype(np.int64) + 1) - 1
+                self.kabuka[idx] += unzigzag(vals[1::2])
+        else:
+            raise ValueError("知らない種類です: " + str(kind))
+        self.tick = tick
+        return self.kabuka
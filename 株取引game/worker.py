@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from market import KAU, URU, Order, OrderQueue
+from scheduler import advance
+
+## 市場を別のスレッドで動かす
+## 株価の計算・配当・記録はすべてこのスレッドで行い、結果は変更できない
+## Snapshot(タプル)にして上限つきのキューへ流す。画面側はafter()でdrain()して描くだけ。
+## 売買や速さの変更もコマンドのキューで渡すので、市場と口座を触るのはこのスレッドだけになる。
+
+## fillsはこのSnapshotまでに約定した注文の(銘柄, KAU/URU, 注文した株数, 約定した株数)
+Snapshot = namedtuple("Snapshot", "tick q kabuka motika kane fills")
+
+
+class MarketWorker(threading.Thread):
+
+    def __init__(self, market, portfolio, interval=1.0, maxsize=64, sink=None):
+        super().__init__(name="MarketWorker", daemon=True)
+        self.market = market
+        self.portfolio = portfolio
+        self.interval = interval  # 1tickの秒数(speed=1のとき)
+        self.sink = sink
+        self.orders = OrderQueue(market)
+        self.snapshots = queue.Queue(maxsize)
+        self.commands = queue.Queue()
+        self.dropped = 0  # キューがいっぱいで捨てた古いSnapshotの数
+        self.__speed = 1.0
+
+    #== 画面側のスレッドから呼ぶもの
+
+    def buy(self, i, qty=None):
+        self.commands.put(("order", Order(self.portfolio, i, KAU, qty)))
+
+    def sell(self, i, qty=None):
+        self.commands.put(("order", Order(self.portfolio, i, URU, qty)))
+
+    ## funcを市場のスレッドで呼ぶ(市場の状態を読むときなど)
+    def call(self, func):
+        self.commands.put(("call", func))
+
+    @property
+    def speed(self):
+        return self.__speed
+
+    @speed.setter
+    def speed(self, speed):
+        if speed < 0:
+            raise ValueError("speedは0以上です")
+        self.__speed = speed
+        self.commands.put(("speed", speed))
+
+    def stop(self, timeout=None):
+        self.commands.put(("stop",))
+        if self.is_alive():
+            self.join(timeout)
+
+    ## たまっているSnapshotを古い順に全部取り出す
+    def drain(self):
+        snaps = []
+        while True:
+            try:
+                snaps.append(self.snapshots.get_nowait())
+            except queue.Empty:
+                return snaps
+
+    #== ここから下は市場のスレッド
+
+    def __publish(self, fills=()):
+        m = self.market
+        p = self.portfolio
+        snap = Snapshot(m.tick, m.q, tuple(m.kabuka.tolist()), tuple(p.motika), p.kane, fills)
+        while True:
+            try:
+                self.snapshots.put_nowait(snap)
+                return
+            except queue.Full:
+                # 画面が追いつかないときは古いものから捨てる
+                try:
+                    self.snapshots.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def __tick(self):
+        self.market.x()
+        self.portfolio.haitou()
+        if self.sink is not None:
+            self.sink.tick(self.market, self.portfolio)
+        self.__publish()
+
+    ## コマンドを処理する。stopならFalse
+    def __handle(self, cmd):
+        running = True
+        while cmd is not None:
+            if cmd[0] == "order":
+                self.orders.submit(cmd[1])
+            elif cmd[0] == "call":
+                cmd[1]()
+            elif cmd[0] == "speed":
+                self.__next = None
+            elif cmd[0] == "stop":
+                running = False
+            try:
+                cmd = self.commands.get_nowait()
+            except queue.Empty:
+                cmd = None
+        if len(self.orders) > 0:
+            done = self.orders.match()
+            self.__publish(tuple((o.i, o.side, o.qty, o.filled) for o in done))
+        return running
+
+    def run(self):
+        self.__publish()
+        self.__next = None
+        while True:
+            speed = self.__speed
+            if speed > 0 and self.__next is None:
+                self.__next = time.perf_counter() + self.interval / speed
+            if speed > 0:
+                timeout = max(0.0, self.__next - time.perf_counter())
+            else:
+                timeout = None
+            try:
+                cmd = self.commands.get(timeout=timeout)
+            except queue.Empty:
+                cmd = None
+            if cmd is not None:
+                if not self.__handle(cmd):
+                    break
+                continue
+            now = time.perf_counter()
+            if self.__next is not None and now >= self.__next:
+                self.__tick()
+                self.__next, _ = advance(self.__next, now, self.interval / speed)
+        if self.sink is not None:
+            self.sink.flush()